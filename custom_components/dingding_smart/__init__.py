@@ -4,17 +4,16 @@
 基于逆向的Python推送实现
 """
 import asyncio
-import json
 import logging
-import socket
-import ssl
-import struct
-import threading
+import os
 import time
 import random
 import platform
+from collections import deque
+from contextlib import nullcontext
 from dataclasses import dataclass
-from typing import Any, Callable, Optional, Dict
+from datetime import timedelta
+from typing import Any, Callable, Hashable, Optional, Dict, Set, Tuple
 
 import aiohttp
 import voluptuous as vol
@@ -25,10 +24,41 @@ from homeassistant.const import (
     CONF_USERNAME,
     Platform,
 )
-from homeassistant.core import HomeAssistant, Event, HomeAssistantError
+from homeassistant.core import (
+    CoreState,
+    Event,
+    HomeAssistant,
+    HomeAssistantError,
+    ServiceCall,
+    callback,
+)
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util
+
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # Home Assistant 2023.7之前不支持服务返回数据
+    SupportsResponse = None
+
+from . import codec
+from .auth import TokenManager
+from .bootstrap import BootstrapTimeline
+from .dedup import DEFAULT_TTL as DEFAULT_PUSH_DEDUP_TTL
+from .hub import (
+    PUSH_MODE_ASYNCIO,
+    PUSH_MODE_THREAD,
+    PushHub,
+    create_background_task,
+    generate_push_identity,
+)
+from .journal import EventJournal, query_records
+from .polling import DEFAULT_POLL_INTERVAL, PollPolicy
+from .protocol import PushEvent
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -44,6 +74,11 @@ CONF_TOKEN = "token"
 CONF_REFLASH_KEY = "reflash_key"
 CONF_LOGOUT_STATUS = "logout_status"
 CONF_TIME = "time"
+CONF_PUSH_MODE = "push_mode"
+CONF_PUSH_DEDUP_TTL = "push_dedup_ttl"
+CONF_POLL_INTERVAL = "poll_interval"
+CONF_BOUND_PUSH_TOKEN = "bound_push_token"
+CONF_BOUND_API_TOKEN = "bound_api_token"
 
 # 服务器区域
 REGION_CN = "cn"
@@ -69,6 +104,54 @@ SERVERS = {
     },
 }
 
+# reflash_key刷新token的接口（服务器返回404/405或不返回token时停用，改为重新登录）
+TOKEN_REFRESH_PATH = "v1/api/user/reflash"
+
+# 登录/刷新得到新token后延迟写入配置项，合并短时间内的多次更新
+CREDENTIALS_SAVE_DELAY = 10  # 秒
+
+# 推送token绑定失败后在后台重试（完全抖动的指数退避）
+BIND_RETRY_BASE_DELAY = 5.0  # 秒
+BIND_RETRY_MAX_DELAY = 300.0  # 秒
+
+# 设备列表缓存的新鲜时间，刚获取的设备列表在该时间内直接返回，不再请求服务器
+DEVICE_LIST_FRESHNESS = 5.0  # 秒
+
+# 上一次成功获取的设备列表保存在.storage中，启动时先用缓存创建实体，再在后台刷新
+DEVICE_CACHE_STORAGE_VERSION = 1
+DEVICE_CACHE_SAVE_DELAY = 10  # 秒
+
+# API请求头模板
+LOGIN_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "formal": "formal",
+}
+AUTH_HEADERS = {
+    "baseUrl": "formal",
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "bundleid": "com.lancens.wxdoorbell",
+}
+
+# API请求超时（秒，按接口）和重试（网络错误、超时、5xx/429，完全抖动的指数退避）
+API_DEFAULT_TIMEOUT = 15
+API_TIMEOUTS = {
+    "login": 15,
+    "refresh": 10,
+    "device_list": 15,
+    "bind_call": 10,
+    "bind_notify": 10,
+}
+API_MAX_ATTEMPTS = 3
+API_RETRY_BASE_DELAY = 0.5  # 秒
+API_RETRY_MAX_DELAY = 4.0  # 秒
+
+# 未使用Home Assistant共享会话时（例如独立运行）自建连接池的参数
+API_CONNECTION_LIMIT = 4
+API_DNS_CACHE_TTL = 300  # 秒
+API_KEEPALIVE_TIMEOUT = 30  # 秒
+
 # 推送事件类型
 PUSH_TYPE_PIR = "0"
 PUSH_TYPE_CALL = "1"
@@ -91,6 +174,64 @@ EVENT_DOOR_OFFLINE = f"{DOMAIN}_door_offline"
 EVENT_DOOR_ONLINE = f"{DOMAIN}_door_online"
 EVENT_ALARM = f"{DOMAIN}_alarm"
 
+
+def signal_push(entry_id: str, uid: Optional[str], event_type: str) -> str:
+    """配置项内按设备UID和事件类型路由推送的dispatcher信号
+
+    公共的总线事件保持不变，实体只订阅自己设备的信号，一次推送只唤醒该设备的实体。
+    """
+    return f"{DOMAIN}_{entry_id}_{uid}_{event_type}"
+
+
+def signal_device_patch(entry_id: str) -> str:
+    """推送修改设备数据的dispatcher信号，参数为(设备UID, 修改的字段)"""
+    return f"{DOMAIN}_{entry_id}_device_patch"
+
+# 推送事件日志
+JOURNAL_FLUSH_INTERVAL = 5  # 秒，批量落盘间隔
+
+# 实体就绪前最多暂存的推送数（超出时丢弃最早的推送）
+PENDING_PUSH_LIMIT = 100
+
+# "最新开门"传感器的监听context为(设备UID, LAST_UNLOCK_CONTEXT)
+LAST_UNLOCK_CONTEXT = "last_unlock"
+
+# 推送直接修改的设备字段（设备列表接口不返回这些字段，轮询时保留）
+ATTR_ONLINE = "online"
+ATTR_LOW_BATTERY = "low_battery"
+ATTR_LAST_SEEN = "last_seen"
+
+# 推送修改的在线状态在推送之后第一次轮询到的dev_update_time再次变化后失效（以轮询结果为准）；
+# 设备列表没有dev_update_time时最长保留该时间
+ONLINE_PATCH_MAX_AGE = 3600  # 秒
+SERVICE_QUERY_EVENTS = "query_events"
+SERVICE_REPLAY_EVENTS = "replay_events"
+SERVICE_ROTATE_PUSH_IDENTITY = "rotate_push_identity"
+ATTR_REGION = "region"
+ATTR_UID = "uid"
+ATTR_EVENT_TYPE = "event_type"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_LIMIT = "limit"
+
+JOURNAL_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_UID): cv.string,
+        vol.Optional(ATTR_EVENT_TYPE): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+        vol.Optional(ATTR_LIMIT, default=100): vol.All(vol.Coerce(int), vol.Range(min=1, max=10000)),
+    }
+)
+
+ROTATE_IDENTITY_SERVICE_SCHEMA = vol.Schema(
+    {vol.Optional(ATTR_REGION): vol.In([REGION_CN, REGION_EU, REGION_US])}
+)
+
+# 推送客户端身份（按区域）保存在.storage中，重启后用同一身份注册
+PUSH_IDENTITY_STORAGE_KEY = f"{DOMAIN}.push_identity"
+PUSH_IDENTITY_STORAGE_VERSION = 1
+
 CONFIG_SCHEMA = vol.Schema(
     {
         DOMAIN: vol.Schema(
@@ -123,6 +264,8 @@ async def async_setup(hass: HomeAssistant, config: dict):
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """设置配置项"""
+    timeline = BootstrapTimeline()
+    timeline.start("setup")
     config = entry.data
     username = config[CONF_USERNAME]
     password = config[CONF_PASSWORD]
@@ -133,86 +276,479 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     token = config.get(CONF_TOKEN)
     reflash_key = config.get(CONF_REFLASH_KEY)
     logout_status = config.get(CONF_LOGOUT_STATUS)
-    time = config.get(CONF_TIME)
+    issued_time = config.get(CONF_TIME)
+    push_mode = config.get(CONF_PUSH_MODE, PUSH_MODE_ASYNCIO)
+    dedup_ttl = config.get(CONF_PUSH_DEDUP_TTL, DEFAULT_PUSH_DEDUP_TTL)
 
-    # 创建API客户端
-    api_client = DingDingAPI(username, password, region)
+    # 创建API客户端（使用Home Assistant共享的HTTP会话）
+    api_client = DingDingAPI(username, password, region, async_get_clientsession(hass))
     
     # 从配置中加载持久化的token
     if token:
-        api_client.token = token
-        api_client.user_id = user_id
-        api_client.reflash_key = reflash_key
-        api_client.logout_status = logout_status
-        api_client.time = time
+        api_client.restore_credentials(token, user_id, reflash_key, logout_status, issued_time)
         _LOGGER.info("从配置中加载token成功, 用户ID: %s", user_id)
 
-    # 创建推送监听器（使用逆向的实现）
+    # 获取所在区域共享的推送中心，创建本配置项的推送监听器
+    with timeline.phase("push_hub"):
+        hub = await async_get_push_hub(hass, region, imei, push_mode, dedup_ttl)
+    bound_tokens = None
+    if config.get(CONF_BOUND_PUSH_TOKEN) and config.get(CONF_BOUND_API_TOKEN):
+        bound_tokens = (config[CONF_BOUND_PUSH_TOKEN], config[CONF_BOUND_API_TOKEN])
     push_listener = PushListener(
+        hass, api_client, hub, device_uid, user_id, entry.entry_id, bound_tokens
+    )
+    push_listener.timeline = timeline
+
+    # 登录/刷新得到的新token和绑定结果延迟批量写入配置项；API token变化后重新绑定推送token
+    credential_writer = CredentialWriter(hass, entry, api_client, push_listener)
+    push_listener.on_bound = credential_writer.schedule
+
+    @callback
+    def _on_credentials_updated():
+        credential_writer.schedule()
+        push_listener.async_bind()
+
+    api_client.on_credentials_updated = _on_credentials_updated
+
+    # 创建协调器
+    coordinator = DingDingCoordinator(
         hass,
         api_client,
-        SERVERS[region]["push_host"],
-        SERVERS[region]["push_port"],
-        device_uid,
-        user_id,
-        imei,
+        push_listener,
+        get_poll_interval(entry),
+        _device_cache_store(hass, entry.entry_id),
     )
+    coordinator.timeline = timeline
 
-    # 创建协调器
-    coordinator = DingDingCoordinator(hass, api_client, push_listener)
+    # 打开推送事件日志，恢复最新开门事件
+    journal = EventJournal(hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.journal"))
+    try:
+        with timeline.phase("journal"):
+            last_unlock = await hass.async_add_executor_job(_open_journal, journal)
+    except Exception as err:  # 日志损坏或无法读写时不影响集成的其他功能
+        _LOGGER.warning("打开推送事件日志失败: %s", err)
+    else:
+        push_listener.journal = journal
+        if last_unlock:
+            coordinator.last_unlock_event = last_unlock["data"]
+            _LOGGER.info("从推送事件日志恢复最新开门事件: %s", coordinator.last_unlock_event)
 
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "api": api_client,
         "push": push_listener,
         "coordinator": coordinator,
+        "credentials": credential_writer,
+        "bootstrap": timeline,
     }
 
-    # 尝试登录
-    try:
-        await coordinator.async_refresh()
-        
-        # 登录成功后更新配置，保存token
-        if api_client.token:
-            new_config = {
-                CONF_USER_ID: api_client.user_id,
-                CONF_TOKEN: api_client.token,
-                CONF_REFLASH_KEY: api_client.reflash_key,
-                CONF_LOGOUT_STATUS: api_client.logout_status,
-                CONF_TIME: api_client.time,
-            }
-            # 合并现有配置
-            updated_config = {**config, **new_config}
-            # 使用正确的方法更新配置
-            hass.config_entries.async_update_entry(entry, data=updated_config)
-            _LOGGER.info("token已持久化保存")
-    except Exception as err:
-        _LOGGER.error("登录失败: %s", err)
-        raise ConfigEntryNotReady from err
+    # 先启动推送监听：推送连接和注册不依赖登录结果，与登录、获取设备列表并行进行，
+    # 推送token到达时绑定等待同一次登录完成；实体就绪前收到的推送暂存在监听器中
+    await push_listener.async_start()
+
+    # 有缓存的设备列表时直接创建实体，登录和获取设备列表在后台进行，启动不等待服务器
+    with timeline.phase("device_cache"):
+        from_cache = await coordinator.async_load_cache()
+    timeline.info["from_cache"] = from_cache
+    timeline.info["cached_devices"] = len(coordinator.device_index) if from_cache else 0
+    if not from_cache:
+        # 第一次设置没有缓存，需要设备列表才能创建实体；获取失败时由Home Assistant稍后重试设置
+        with timeline.phase("first_refresh"):
+            await coordinator.async_refresh()
+        if not coordinator.synced:
+            await _async_release_entry(hass, entry)
+            raise ConfigEntryNotReady("登录或获取设备列表失败")
 
     # 设置平台
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    try:
+        with timeline.phase("platforms"):
+            await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except Exception:
+        await _async_release_entry(hass, entry)
+        raise
+
+    # 推送直接修改设备数据（在线状态、低电量、最后活动时间）
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, signal_device_patch(entry.entry_id), coordinator.async_apply_patch
+        )
+    )
 
-    # 启动推送监听
-    await push_listener.async_start()
+    # 实体已添加，按顺序分发暂存的推送
+    push_listener.async_set_ready()
+
+    # 设备上线/离线后缩短一段时间的轮询间隔；选项修改后更新轮询间隔
+    for uid in coordinator.device_index:
+        for event_type in (EVENT_DOOR_ONLINE, EVENT_DOOR_OFFLINE):
+            entry.async_on_unload(
+                async_dispatcher_connect(
+                    hass,
+                    signal_push(entry.entry_id, uid, event_type),
+                    coordinator.async_boost_polling,
+                )
+            )
+    entry.async_on_unload(entry.add_update_listener(_async_update_options))
+
+    _async_register_services(hass)
+
+    if from_cache:
+        # 后台任务不被Home Assistant跟踪，启动不等待登录和获取设备列表
+        refresh_task = create_background_task(
+            hass,
+            _async_refresh_cached(hass, entry, coordinator, timeline),
+            f"dingding_smart_refresh_{entry.entry_id}",
+        )
+        entry.async_on_unload(refresh_task.cancel)
+
+    timeline.end("setup")
+    _LOGGER.info(
+        "配置项设置完成，用时%.0f毫秒（%s）",
+        timeline.duration("setup"),
+        f"缓存设备{timeline.info['cached_devices']}个" if from_cache else "无缓存",
+    )
 
     return True
 
 
+async def _async_refresh_cached(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: "DingDingCoordinator",
+    timeline: BootstrapTimeline,
+):
+    """后台刷新缓存的设备列表，出现缓存中没有的设备时重新加载配置项以创建实体"""
+    cached_uids = set(coordinator.device_index)
+    with timeline.phase("first_refresh"):
+        await coordinator.async_refresh()
+    _LOGGER.debug("后台刷新设备列表完成，用时%.0f毫秒", timeline.duration("first_refresh"))
+
+    new_uids = set(coordinator.device_index) - cached_uids
+    if new_uids:
+        _LOGGER.info("发现新设备%s，重新加载配置项", sorted(new_uids))
+        await coordinator.async_save_cache()
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
+
+
+def _device_cache_store(hass: HomeAssistant, entry_id: str) -> Store:
+    """配置项的设备列表缓存"""
+    return Store(hass, DEVICE_CACHE_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.devices")
+
+
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """配置项更新（选项修改）"""
+    data = hass.data[DOMAIN].get(entry.entry_id)
+    if data:
+        data["coordinator"].set_poll_interval(get_poll_interval(entry))
+
+
+def get_poll_interval(entry: ConfigEntry) -> int:
+    """基础轮询间隔（秒），选项优先于配置数据"""
+    return entry.options.get(
+        CONF_POLL_INTERVAL, entry.data.get(CONF_POLL_INTERVAL, DEFAULT_POLL_INTERVAL)
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """卸载配置项"""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        data = hass.data[DOMAIN].pop(entry.entry_id)
-        await data["push"].async_stop()
+        await _async_release_entry(hass, entry)
 
     return unload_ok
 
 
+async def _async_release_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """释放配置项的运行数据（卸载或设置失败时）：停止推送监听，写入待保存的凭据，关闭API会话"""
+    data = hass.data[DOMAIN].pop(entry.entry_id, None)
+    if data is None:
+        return
+    await data["push"].async_stop()
+    data["credentials"].flush()
+    await data["api"].close()
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """删除配置项时删除推送事件日志和设备列表缓存"""
+    path = hass.config.path(STORAGE_DIR, f"{DOMAIN}.{entry.entry_id}.journal")
+    await hass.async_add_executor_job(_remove_file, path)
+    await _device_cache_store(hass, entry.entry_id).async_remove()
+
+
+def _open_journal(journal: EventJournal) -> Optional[dict]:
+    """打开推送事件日志，返回最新一条开门事件（在执行器中运行）"""
+    try:
+        journal.open()
+        return journal.last(EVENT_DOOR_UNLOCK)
+    except Exception:
+        journal.close()
+        raise
+
+
+def _remove_file(path: str):
+    """删除文件（不存在时忽略）"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@callback
+def _async_register_services(hass: HomeAssistant):
+    """注册推送事件日志的查询和回放服务，以及更换推送客户端身份的服务"""
+    if hass.services.has_service(DOMAIN, SERVICE_REPLAY_EVENTS):
+        return
+
+    async def async_rotate_push_identity(call: ServiceCall):
+        """更换推送客户端身份（不指定区域时更换所有已连接区域）"""
+        region = call.data.get(ATTR_REGION)
+        regions = [region] if region else list(hass.data[DOMAIN].get("hubs", {}))
+        for region in regions:
+            await _async_rotate_push_identity(hass, region)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ROTATE_PUSH_IDENTITY,
+        async_rotate_push_identity,
+        schema=ROTATE_IDENTITY_SERVICE_SCHEMA,
+    )
+
+    async def async_query(call: ServiceCall) -> list:
+        """查询所有配置项的推送事件日志，按时间排序
+
+        日志只在事件循环中修改：在事件循环中复制记录，解码和过滤在执行器中进行。
+        """
+        snapshots = []
+        for data in hass.data.get(DOMAIN, {}).values():
+            if not isinstance(data, dict) or "push" not in data:
+                continue
+            journal = data["push"].journal
+            if journal is not None and journal.is_open:
+                snapshots.append(journal.snapshot())
+
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        filters = {
+            "uid": call.data.get(ATTR_UID),
+            "event_type": call.data.get(ATTR_EVENT_TYPE),
+            "start": dt_util.as_timestamp(start) if start else None,
+            "end": dt_util.as_timestamp(end) if end else None,
+        }
+
+        def scan() -> list:
+            records = []
+            for snapshot in snapshots:
+                records.extend(query_records(snapshot.raw_records(), **filters))
+            records.sort(key=lambda record: record["time"])
+            return records[-call.data[ATTR_LIMIT]:]
+
+        return await hass.async_add_executor_job(scan)
+
+    async def async_replay_events(call: ServiceCall):
+        """把日志中的事件重新触发到Home Assistant（事件数据带replayed标记）"""
+        records = await async_query(call)
+        for record in records:
+            hass.bus.async_fire(record["event_type"], {**record["data"], "replayed": True})
+        _LOGGER.info("已回放%d条推送事件", len(records))
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REPLAY_EVENTS, async_replay_events, schema=JOURNAL_SERVICE_SCHEMA
+    )
+
+    if SupportsResponse is not None:
+
+        async def async_query_events(call: ServiceCall) -> dict:
+            """查询推送事件日志"""
+            return {
+                "events": [
+                    {
+                        "time": dt_util.utc_from_timestamp(record["time"]).isoformat(),
+                        "event_type": record["event_type"],
+                        "data": record["data"],
+                    }
+                    for record in await async_query(call)
+                ]
+            }
+
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_QUERY_EVENTS,
+            async_query_events,
+            schema=JOURNAL_SERVICE_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+
+async def async_get_push_hub(
+    hass: HomeAssistant,
+    region: str,
+    imei: Optional[str] = None,
+    push_mode: str = PUSH_MODE_ASYNCIO,
+    dedup_ttl: float = DEFAULT_PUSH_DEDUP_TTL,
+) -> PushHub:
+    """获取区域共享的推送中心（同一区域的多个账号共用一条推送连接）"""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    hubs = domain_data.setdefault("hubs", {})
+    hub = hubs.get(region)
+    if hub is None:
+        identity = await _async_get_push_identity(hass, region)
+        # 加载身份期间其他配置项可能已经创建了推送中心
+        hub = hubs.get(region)
+    if hub is None:
+        hub = PushHub(
+            hass,
+            SERVERS[region]["push_host"],
+            SERVERS[region]["push_port"],
+            imei,
+            push_mode,
+            dedup_ttl,
+            identity,
+        )
+        hubs[region] = hub
+        return hub
+
+    # 推送连接由区域内的配置项共享，使用第一个配置项的设置
+    if hub.push_mode != push_mode:
+        _LOGGER.warning(
+            "区域%s的推送中心已使用%s模式，忽略配置的%s模式", region, hub.push_mode, push_mode
+        )
+    if imei and imei != hub.imei:
+        _LOGGER.warning(
+            "区域%s的推送中心已使用IMEI %s注册，忽略配置的IMEI %s",
+            region,
+            hub.imei or hub.identity["imei"],
+            imei,
+        )
+    if dedup_ttl != hub.dedup.ttl:
+        _LOGGER.warning(
+            "区域%s的推送中心去重时间窗口为%s秒，忽略配置的%s秒", region, hub.dedup.ttl, dedup_ttl
+        )
+    return hub
+
+
+async def _async_identity_store(hass: HomeAssistant) -> Tuple[Store, Dict[str, dict]]:
+    """推送客户端身份存储和已加载的数据 {区域: {"imei": ..., "imsi": ...}}"""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    lock = domain_data.setdefault("push_identity_lock", asyncio.Lock())
+    async with lock:
+        if "push_identity" not in domain_data:
+            store = Store(hass, PUSH_IDENTITY_STORAGE_VERSION, PUSH_IDENTITY_STORAGE_KEY)
+            domain_data["push_identity"] = (store, await store.async_load() or {})
+    return domain_data["push_identity"]
+
+
+async def _async_get_push_identity(hass: HomeAssistant, region: str) -> Dict[str, str]:
+    """获取区域的推送客户端身份，第一次使用时生成并保存"""
+    store, identities = await _async_identity_store(hass)
+    identity = identities.get(region)
+    if not identity or not identity.get("imei") or not identity.get("imsi"):
+        identity = identities[region] = generate_push_identity()
+        await store.async_save(identities)
+        _LOGGER.info("已生成区域%s的推送客户端身份", region)
+    return identity
+
+
+async def _async_rotate_push_identity(hass: HomeAssistant, region: str):
+    """为区域生成新的推送客户端身份，正在运行的推送中心用新身份重新注册"""
+    store, identities = await _async_identity_store(hass)
+    identity = identities[region] = generate_push_identity()
+    await store.async_save(identities)
+    hub = hass.data[DOMAIN].get("hubs", {}).get(region)
+    if hub is not None:
+        hub.set_identity(identity)
+    _LOGGER.info("已更换区域%s的推送客户端身份", region)
+
+
+class CredentialWriter:
+    """把API客户端登录/刷新得到的token和已绑定的推送token写入配置项
+
+    短时间内的多次更新合并为一次写入，内容没有变化时不写入。
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        api: "DingDingAPI",
+        push_listener: "PushListener",
+    ):
+        self.hass = hass
+        self.entry = entry
+        self.api = api
+        self.push_listener = push_listener
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.writes = 0
+        self.unchanged = 0
+
+    @callback
+    def schedule(self):
+        """延迟写入"""
+        if self._timer is None:
+            self._timer = self.hass.loop.call_later(CREDENTIALS_SAVE_DELAY, self.flush)
+
+    @callback
+    def flush(self):
+        """立即写入（取消等待中的延迟写入）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        api = self.api
+        if not api.token:
+            return
+        credentials = {
+            CONF_USER_ID: api.user_id,
+            CONF_TOKEN: api.token,
+            CONF_REFLASH_KEY: api.reflash_key,
+            CONF_LOGOUT_STATUS: api.logout_status,
+            CONF_TIME: api.time,
+        }
+        bound = self.push_listener.bound_tokens
+        if bound:
+            credentials[CONF_BOUND_PUSH_TOKEN], credentials[CONF_BOUND_API_TOKEN] = bound
+        data = self.entry.data
+        if all(data.get(key) == value for key, value in credentials.items()):
+            self.unchanged += 1
+            return
+        self.hass.config_entries.async_update_entry(self.entry, data={**data, **credentials})
+        self.writes += 1
+        _LOGGER.info("token已持久化保存")
+
+
+def _preview(body: bytes, limit: int) -> str:
+    """响应内容预览（用于日志）"""
+    text = body[:limit].decode("utf-8", "replace")
+    return text + "..." if len(body) > limit else text
+
+
+class DingDingApiError(Exception):
+    """API请求失败"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class DingDingAuthError(DingDingApiError):
+    """token无效且重新登录失败"""
+
+
 class DingDingAPI:
-    """钉钉智能API客户端"""
+    """钉钉智能API客户端
+
+    在Home Assistant中使用共享的HTTP会话（连接池和keep-alive由Home Assistant管理），
+    未传入会话时自行创建带连接池的会话，close()只关闭自己创建的会话。
+    所有接口都通过_request()发送：统一请求头、JSON解码、token失效时重新登录、
+    网络错误和服务器错误按抖动退避重试、按接口设置超时并记录耗时。
+    """
 
-    def __init__(self, username: str, password: str, region: str = REGION_CN):
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        region: str = REGION_CN,
+        session: Optional[aiohttp.ClientSession] = None,
+        device_list_freshness: float = DEVICE_LIST_FRESHNESS,
+    ):
         self.username = username
         self.password = password
         self.region = region
@@ -221,7 +757,27 @@ class DingDingAPI:
         self.reflash_key = None
         self.logout_status = None
         self.time = None
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session: Optional[aiohttp.ClientSession] = session
+        self._owns_session = session is None
+
+        # token过期前主动续期，并发登录合并为一次
+        self.auth = TokenManager(self._password_login, self._refresh_login)
+        # 登录/刷新得到新token后的回调（用于持久化到配置项）
+        self.on_credentials_updated: Optional[Callable[[], None]] = None
+
+        # 设备列表：并发调用共享同一次请求，刚获取的结果在新鲜时间内直接返回
+        self.device_list_freshness = device_list_freshness
+        self._device_list_task: Optional[asyncio.Future] = None
+        self._device_list_cache: Optional[list] = None
+        self._device_list_fetched_at = 0.0
+        self.device_list_stats = {
+            "fetches": 0,
+            "coalesced": 0,
+            "cache_hits": 0,
+        }
+
+        # 按接口统计请求次数、重试、耗时
+        self.request_stats: Dict[str, Dict[str, Any]] = {}
 
     @property
     def api_host(self) -> str:
@@ -231,855 +787,673 @@ class DingDingAPI:
     async def _get_session(self) -> aiohttp.ClientSession:
         """获取或创建HTTP会话"""
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
+            connector = aiohttp.TCPConnector(
+                limit=API_CONNECTION_LIMIT,
+                ttl_dns_cache=API_DNS_CACHE_TTL,
+                keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
         return self._session
 
-    async def login(self) -> bool:
-        """登录"""
-        _LOGGER.info("=" * 60)
-        _LOGGER.info("开始登录流程")
-        _LOGGER.info("=" * 60)
-        _LOGGER.info("用户名: %s", self.username)
-        _LOGGER.info("API主机: %s", self.api_host)
-        
+    def _headers(self, auth: bool) -> Dict[str, str]:
+        """请求头（auth为True时带token）"""
+        if not auth:
+            return dict(LOGIN_HEADERS)
+        headers = dict(AUTH_HEADERS)
+        headers["Token"] = self.token or ""
+        return headers
+
+    async def _request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        payload: Optional[dict] = None,
+        auth: bool = True,
+        renew_auth: bool = True,
+    ) -> Any:
+        """发送API请求，返回解码后的JSON
+
+        auth: 请求头带token；renew_auth: token失效时重新登录并重试一次。
+        网络错误、超时和5xx/429按抖动退避重试，最多API_MAX_ATTEMPTS次。
+        失败时抛出DingDingApiError（token无效且重新登录失败时为DingDingAuthError）。
+        """
+        if auth and renew_auth and not await self.ensure_token():
+            raise DingDingAuthError("登录失败")
+
         session = await self._get_session()
-        url = f"{self.api_host}v1/api/user/login"
+        url = f"{self.api_host}{path}"
+        timeout = aiohttp.ClientTimeout(total=API_TIMEOUTS.get(endpoint, API_DEFAULT_TIMEOUT))
+        stats = self._endpoint_stats(endpoint)
+        attempt = 0
+        renewed = False
+
+        while True:
+            attempt += 1
+            token = self.token
+            stats["requests"] += 1
+            start = time.monotonic()
+            try:
+                async with session.request(
+                    method, url, headers=self._headers(auth), json=payload, timeout=timeout
+                ) as resp:
+                    status = resp.status
+                    body = await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                self._record_timing(stats, time.monotonic() - start)
+                stats["errors"] += 1
+                if attempt < API_MAX_ATTEMPTS:
+                    await self._retry_wait(endpoint, stats, attempt, err)
+                    continue
+                raise DingDingApiError(f"{endpoint}请求失败: {err!r}") from err
+            self._record_timing(stats, time.monotonic() - start)
 
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "formal": "formal",
-        }
+            try:
+                result = codec.loads(body) if body else None
+            except (codec.JSONDecodeError, UnicodeDecodeError):
+                result = None
+
+            if auth and _auth_expired(status, result, body):
+                if not renew_auth or renewed:
+                    stats["errors"] += 1
+                    raise DingDingAuthError(f"{endpoint}: token无效", status)
+                renewed = True
+                stats["auth_renewals"] += 1
+                # 其他请求已经换了新token时直接重试
+                if self.token == token:
+                    _LOGGER.warning("Token无效，尝试重新登录")
+                    if not await self.login():
+                        raise DingDingAuthError("重新登录失败", status)
+                attempt -= 1
+                continue
+
+            if (status >= 500 or status == 429) and attempt < API_MAX_ATTEMPTS:
+                stats["errors"] += 1
+                await self._retry_wait(endpoint, stats, attempt, f"HTTP {status}")
+                continue
+
+            if not 200 <= status < 300:
+                stats["errors"] += 1
+                raise DingDingApiError(
+                    f"{endpoint}失败，状态码: {status}, 响应: {_preview(body, 200)}", status
+                )
+            if result is None:
+                stats["errors"] += 1
+                raise DingDingApiError(f"{endpoint}响应不是有效的JSON: {_preview(body, 200)}", status)
+            return result
 
-        data = {"username": self.username, "password": self.password}
+    def _endpoint_stats(self, endpoint: str) -> Dict[str, Any]:
+        stats = self.request_stats.get(endpoint)
+        if stats is None:
+            stats = self.request_stats[endpoint] = {
+                "requests": 0,
+                "errors": 0,
+                "retries": 0,
+                "auth_renewals": 0,
+                "last_ms": None,
+                "avg_ms": None,
+                "max_ms": None,
+            }
+        return stats
+
+    @staticmethod
+    def _record_timing(stats: Dict[str, Any], elapsed: float):
+        """记录请求耗时"""
+        elapsed_ms = round(elapsed * 1000, 1)
+        stats["last_ms"] = elapsed_ms
+        if stats["avg_ms"] is None:
+            stats["avg_ms"] = stats["max_ms"] = elapsed_ms
+        else:
+            # 指数滑动平均
+            stats["avg_ms"] = round(stats["avg_ms"] + (elapsed_ms - stats["avg_ms"]) * 0.2, 1)
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    @staticmethod
+    async def _retry_wait(endpoint: str, stats: Dict[str, Any], attempt: int, reason: Any):
+        """重试前等待（完全抖动的指数退避）"""
+        stats["retries"] += 1
+        delay = random.random() * min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        _LOGGER.debug("%s请求失败（%s），%.2f秒后第%d次重试", endpoint, reason, delay, attempt)
+        await asyncio.sleep(delay)
+
+    def restore_credentials(self, token: str, user_id, reflash_key, logout_status, time_value):
+        """加载持久化的token"""
+        self.token = token
+        self.user_id = user_id
+        self.reflash_key = reflash_key
+        self.logout_status = logout_status
+        self.time = time_value
+        self.auth.set_issued(time_value)
+
+    async def login(self) -> bool:
+        """用账号密码登录（正在登录时等待同一次登录的结果）"""
+        return await self.auth.renew()
+
+    async def ensure_token(self) -> bool:
+        """确保有可用的token，没有token或即将过期时续期"""
+        return await self.auth.ensure_valid(self.token)
+
+    def _credentials_updated(self):
+        """登录/刷新成功"""
+        self.auth.set_issued(self.time)
+        if self.on_credentials_updated is not None:
+            self.on_credentials_updated()
+
+    async def _refresh_login(self) -> Optional[bool]:
+        """用reflash_key刷新token，服务器不支持刷新接口时返回None"""
+        if not self.token or not self.reflash_key:
+            return False
 
         try:
-            _LOGGER.info("发送登录请求到: %s", url)
-            async with session.post(url, headers=headers, json=data) as resp:
-                _LOGGER.info("登录响应状态码: %s", resp.status)
-                _LOGGER.info("登录响应头: %s", dict(resp.headers))
-                
-                if 200 <= resp.status < 300:
-                    try:
-                        result = await resp.json()
-                        _LOGGER.info("登录响应内容: %s", result)
-                        if isinstance(result, dict) and "token" in result:
-                            # 只支持直接包含token的格式
-                            self.token = result.get("token")
-                            self.user_id = result.get("id")  # 使用id字段作为user_id
-                            self.reflash_key = result.get("reflash_key")
-                            self.logout_status = result.get("logout_status")
-                            self.time = result.get("time")
-                            _LOGGER.info("=" * 60)
-                            _LOGGER.info("登录成功")
-                            _LOGGER.info("=" * 60)
-                            _LOGGER.info("用户ID: %s", self.user_id)
-                            _LOGGER.info("Token: %s", self.token[:10] + "..." if self.token else "无")
-                            _LOGGER.info("Token长度: %s", len(self.token) if self.token else 0)
-                            _LOGGER.info("Reflash Key: %s", self.reflash_key)
-                            _LOGGER.info("Logout Status: %s", self.logout_status)
-                            _LOGGER.info("Time: %s", self.time)
-                            _LOGGER.info("=" * 60)
-                            return True
-                        _LOGGER.error("登录响应格式错误，缺少token: %s", result)
-                        return False
-                    except Exception as e:
-                        _LOGGER.error("解析登录响应失败: %s", e)
-                        return False
-                response_text = await resp.text()
-                _LOGGER.error("登录失败: %s", response_text)
-                return False
-        except Exception as err:
-            _LOGGER.error("登录异常: %s", err)
+            result = await self._request(
+                "refresh", "POST", TOKEN_REFRESH_PATH, {"reflash_key": self.reflash_key},
+                renew_auth=False,
+            )
+        except DingDingApiError as err:
+            if err.status in (404, 405):
+                return None
+            _LOGGER.warning("刷新token失败: %s", err)
             return False
 
-    async def get_device_list(self) -> list:
-        """获取设备列表"""
-        if not self.token:
-            _LOGGER.info("token为空，开始登录")
-            if not await self.login():
-                _LOGGER.error("登录失败，无法获取设备列表")
-                return []
-        _LOGGER.info("使用token: %s", self.token[:10] + "..." if self.token else "无")
+        if not isinstance(result, dict) or not result.get("token"):
+            _LOGGER.debug("刷新token响应不包含token: %s", result)
+            return None
 
-        session = await self._get_session()
-        url = f"{self.api_host}v1/api/user/device"
-
-        headers = {
-            "baseUrl": "formal",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "bundleid": "com.lancens.wxdoorbell",
-            "Token": self.token
-        }
-        _LOGGER.info("请求头: %s", {k: v for k, v in headers.items() if k != "Token"})
-        _LOGGER.info("Token头长度: %s", len(headers.get("Token", "")))
-        _LOGGER.info("Token值: %s", self.token[:10] + "..." if self.token else "无")
+        self.token = result["token"]
+        self.reflash_key = result.get("reflash_key", self.reflash_key)
+        self.time = result.get("time")
+        _LOGGER.info("token刷新成功")
+        self._credentials_updated()
+        return True
+
+    async def _password_login(self) -> bool:
+        """登录"""
+        _LOGGER.info("开始登录，用户名: %s, API主机: %s", self.username, self.api_host)
 
+        data = {"username": self.username, "password": self.password}
         try:
-            async with session.get(url, headers=headers) as resp:
-                _LOGGER.info("获取设备列表响应状态码: %s", resp.status)
-                _LOGGER.info("响应头: %s", dict(resp.headers))
-                
-                if 200 <= resp.status < 300:
-                    # 先读取响应内容
-                    response_text = await resp.text()
-                    _LOGGER.info("响应内容: %s", response_text[:100] + "..." if len(response_text) > 100 else response_text)
-                    
-                    # 检查内容类型
-                    content_type = resp.headers.get("Content-Type", "")
-                    _LOGGER.info("内容类型: %s", content_type)
-                    
-                    # 尝试解析为JSON
-                    try:
-                        result = json.loads(response_text)
-                        _LOGGER.info("成功解析为JSON")
-                        # 检查响应内容是否包含错误
-                        if isinstance(result, dict) and result.get("message") == "no token":
-                            _LOGGER.warning("Token无效，尝试重新登录")
-                            if await self.login():
-                                _LOGGER.info("重新登录成功，新token: %s", self.token[:10] + "..." if self.token else "无")
-                                headers["Token"] = self.token
-                                async with session.get(url, headers=headers) as resp2:
-                                    _LOGGER.info("重试获取设备列表响应状态码: %s", resp2.status)
-                                    if resp2.status == 200:
-                                        return await resp2.json()
-                                    _LOGGER.error("重试获取设备列表失败: %s", await resp2.text())
-                                    return []
-                            _LOGGER.error("重新登录失败，无法获取设备列表")
-                            return []
-                        _LOGGER.info("返回设备列表")
-                        return result
-                    except json.JSONDecodeError:
-                        _LOGGER.error("响应不是有效的JSON，内容类型: %s", content_type)
-                        _LOGGER.error("响应内容: %s", response_text[:200] + "..." if len(response_text) > 200 else response_text)
-                        return []
-                elif resp.status in [401, 400]:
-                    # 401: Unauthorized, 400: Bad Request (可能包含no token错误)
-                    response_text = await resp.text()
-                    _LOGGER.info("响应内容: %s", response_text)
-                    
-                    # 检查响应内容是否包含no token错误
-                    if "no token" in response_text:
-                        _LOGGER.warning("Token无效，尝试重新登录")
-                        if await self.login():
-                            _LOGGER.info("重新登录成功，新token: %s", self.token[:10] + "..." if self.token else "无")
-                            headers["Token"] = self.token
-                            async with session.get(url, headers=headers) as resp2:
-                                _LOGGER.info("重试获取设备列表响应状态码: %s", resp2.status)
-                                if resp2.status == 200:
-                                    return await resp2.json()
-                                _LOGGER.error("重试获取设备列表失败: %s", await resp2.text())
-                                return []
-                        _LOGGER.error("重新登录失败，无法获取设备列表")
-                        return []
-                    elif resp.status == 401:
-                        # Token过期或无效，重新登录
-                        _LOGGER.warning("Token已过期，尝试重新登录")
-                        if await self.login():
-                            # 重新登录成功，重试获取设备列表
-                            _LOGGER.info("重新登录成功，新token: %s", self.token[:10] + "..." if self.token else "无")
-                            headers["Token"] = self.token
-                            async with session.get(url, headers=headers) as resp2:
-                                _LOGGER.info("重试获取设备列表响应状态码: %s", resp2.status)
-                                if resp2.status == 200:
-                                    return await resp2.json()
-                                _LOGGER.error("重试获取设备列表失败: %s", await resp2.text())
-                                return []
-                        _LOGGER.error("重新登录失败，无法获取设备列表")
-                        return []
-                    else:
-                        _LOGGER.error("获取设备列表失败，状态码: %s, 响应: %s", resp.status, response_text)
-                        return []
-                else:
-                    response_text = await resp.text()
-                    _LOGGER.error("获取设备列表失败，状态码: %s, 响应: %s", resp.status, response_text)
-                    return []
-        except Exception as err:
-            _LOGGER.error("获取设备列表异常: %s", err)
+            result = await self._request("login", "POST", "v1/api/user/login", data, auth=False)
+        except DingDingApiError as err:
+            _LOGGER.error("登录失败: %s", err)
+            return False
+
+        if not isinstance(result, dict) or "token" not in result:
+            _LOGGER.error("登录响应格式错误，缺少token: %s", result)
+            return False
+
+        # 只支持直接包含token的格式
+        self.token = result.get("token")
+        self.user_id = result.get("id")  # 使用id字段作为user_id
+        self.reflash_key = result.get("reflash_key")
+        self.logout_status = result.get("logout_status")
+        self.time = result.get("time")
+        _LOGGER.info(
+            "登录成功，用户ID: %s, Token: %s, Time: %s",
+            self.user_id,
+            self.token[:10] + "..." if self.token else "无",
+            self.time,
+        )
+        self._credentials_updated()
+        return True
+
+    async def get_device_list(self, raise_errors: bool = False) -> list:
+        """获取设备列表
+
+        正在请求时等待同一次请求的结果；上一次成功获取的设备列表在新鲜时间内直接返回。
+        请求失败时返回空列表，raise_errors为True时抛出DingDingApiError。
+        """
+        stats = self.device_list_stats
+        cache = self._device_list_cache
+        if cache is not None and time.monotonic() - self._device_list_fetched_at < self.device_list_freshness:
+            stats["cache_hits"] += 1
+            return list(cache)
+
+        task = self._device_list_task
+        if task is not None and not task.done():
+            stats["coalesced"] += 1
+        else:
+            stats["fetches"] += 1
+            task = self._device_list_task = asyncio.ensure_future(self._fetch_device_list())
+        try:
+            return list(await asyncio.shield(task))
+        except DingDingApiError as err:
+            if raise_errors:
+                raise
+            _LOGGER.error("获取设备列表失败: %s", err)
             return []
 
+    def invalidate_device_list(self):
+        """清除设备列表缓存"""
+        self._device_list_cache = None
+
+    async def _fetch_device_list(self) -> list:
+        """请求设备列表，成功时更新缓存"""
+        devices = await self._request("device_list", "GET", "v1/api/user/device")
+        if not isinstance(devices, list):
+            raise DingDingApiError(f"设备列表响应格式错误: {devices}")
+        _LOGGER.debug("获取到%d个设备", len(devices))
+        if devices:
+            self._device_list_cache = devices
+            self._device_list_fetched_at = time.monotonic()
+        return devices
+
     async def close(self):
-        """关闭会话"""
-        if self._session and not self._session.closed:
+        """关闭自己创建的会话（共享会话由Home Assistant关闭）"""
+        if self._owns_session and self._session and not self._session.closed:
             await self._session.close()
-            self._session = None
+        self._session = None
+        self._device_list_cache = None
 
     async def bind_push_token(self, push_token: str) -> bool:
-        """绑定推送Token到服务器"""
-        if not self.token:
+        """绑定推送Token到服务器（来电推送和消息推送同时请求）"""
+        if not await self.ensure_token():
             _LOGGER.error("Token为空，无法绑定推送Token")
             return False
+        results = await asyncio.gather(
+            self.bind_call_push_token(push_token),
+            self.bind_notify_push_token(push_token),
+        )
+        if not all(results):
+            return False
+        _LOGGER.info("推送Token绑定成功")
+        return True
 
-        session = await self._get_session()
-        
-        # 绑定来电推送token
-        bind_call_url = f"{self.api_host}v1/api/user/token"
-        bind_call_data = {
-            "push_token": push_token,
-            "push_platform": "android",
-            "language": "zh",
-            "os_token": "",
-            "os": "Android",
-            "os_push_version": 1,
-            "bundleid": "com.lancens.wxdoorbell",
-            "phone_model": "phone:Xiaomi_Mi_10/App:钉钉智能_1.0.0/Android_11"
-        }
+    async def bind_call_push_token(self, push_token: str) -> bool:
+        """绑定来电推送token"""
+        return await self._bind("bind_call", "v1/api/user/token", push_token, "来电")
 
-        headers = {
-            "baseUrl": "formal",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "bundleid": "com.lancens.wxdoorbell",
-            "Token": self.token
-        }
+    async def bind_notify_push_token(self, push_token: str) -> bool:
+        """绑定消息推送token"""
+        return await self._bind("bind_notify", "v1/api/user/message/token", push_token, "消息")
 
+    async def _bind(self, endpoint: str, path: str, push_token: str, label: str) -> bool:
         try:
-            # 绑定来电推送token
-            _LOGGER.info("绑定来电推送token...")
-            async with session.post(bind_call_url, headers=headers, json=bind_call_data) as resp:
-                if 200 <= resp.status < 300:
-                    result = await resp.json()
-                    _LOGGER.info("绑定来电推送token响应: %s", result)
-                    if result.get("message") != "success":
-                        _LOGGER.error("绑定来电推送token失败: %s", result)
-                        return False
-                else:
-                    _LOGGER.error("绑定来电推送token失败: %s", await resp.text())
-                    return False
-
-            # 绑定消息推送token
-            bind_notify_url = f"{self.api_host}v1/api/user/message/token"
-            _LOGGER.info("绑定消息推送token...")
-            async with session.post(bind_notify_url, headers=headers, json=bind_call_data) as resp:
-                if 200 <= resp.status < 300:
-                    result = await resp.json()
-                    _LOGGER.info("绑定消息推送token响应: %s", result)
-                    if result.get("message") != "success":
-                        _LOGGER.error("绑定消息推送token失败: %s", result)
-                        return False
-                else:
-                    _LOGGER.error("绑定消息推送token失败: %s", await resp.text())
-                    return False
-
-            _LOGGER.info("推送Token绑定成功")
-            return True
-        except Exception as err:
-            _LOGGER.error("绑定推送Token异常: %s", err)
+            result = await self._request(endpoint, "POST", path, _bind_payload(push_token))
+        except DingDingApiError as err:
+            _LOGGER.error("绑定%s推送token失败: %s", label, err)
             return False
+        if not isinstance(result, dict) or result.get("message") != "success":
+            _LOGGER.error("绑定%s推送token失败: %s", label, result)
+            return False
+        _LOGGER.info("绑定%s推送token成功", label)
+        return True
 
 
-class PushListener:
-    """推送监听器（基于逆向的Python实现）"""
+def _auth_expired(status: int, result: Any, body: bytes) -> bool:
+    """响应是否表示token无效（401，或响应内容为no token）"""
+    if status == 401:
+        return True
+    if isinstance(result, dict) and result.get("message") == "no token":
+        return True
+    return status == 400 and b"no token" in body
+
+
+def _bind_payload(push_token: str) -> dict:
+    """绑定推送token的请求数据"""
+    return {
+        "push_token": push_token,
+        "push_platform": "android",
+        "language": "zh",
+        "os_token": "",
+        "os": "Android",
+        "os_push_version": 1,
+        "bundleid": "com.lancens.wxdoorbell",
+        "phone_model": "phone:Xiaomi_Mi_10/App:钉钉智能_1.0.0/Android_11",
+    }
 
-    FLAG_PUSH_CLIENT_TOKEN = "token"
-    keepAlive = True
-    release = True
 
-    # 命令常量
-    CMD_HEARTBEAT = 0
-    CMD_REGISTER = 1
-    CMD_TOKEN = 2
-    CMD_PUSH = 3
+# 推送处理器: 推送类型 -> handler(listener, event)
+PushHandler = Callable[["PushListener", PushEvent], None]
 
-    def __init__(
-        self,
-        hass: HomeAssistant,
-        api: DingDingAPI,
-        push_host: str,
-        push_port: int,
-        device_uid: Optional[str] = None,
-        user_id: int = 0,
-        imei: Optional[str] = None,
-    ):
-        self.hass = hass
-        self.api = api
-        self.push_host = push_host
-        self.push_port = push_port
-        self.device_uid = device_uid
-        self.user_id = user_id
-        self.imei = imei
-        self.push_token = None
-        self.http_token = None
-
-        self._push_thread: Optional[threading.Thread] = None
-        self._ssl_socket: Optional[ssl.SSLSocket] = None
-        self._socket_lock = threading.Lock()
-        self._stop_event = threading.Event()
-        self._ssl_context = self._create_ssl_context()
-        self._bind_completed = False
-
-        # 生成注册信息
-        self._register_info = self._get_register_info()
-
-    def _create_ssl_context(self):
-        """创建自定义SSL安全上下文"""
-        # 使用更基础的方式创建SSL上下文
-        context = ssl.SSLContext()
-        
-        # 禁用证书验证（临时解决方案）
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        
-        # 启用所有TLS版本
-        try:
-            # 尝试使用TLSVersion常量
-            context.min_version = ssl.TLSVersion.TLSv1
-            context.max_version = ssl.TLSVersion.TLSv1_3
-        except AttributeError:
-            # 兼容旧版本Python
-            context.min_version = ssl.TLSVersion.TLSv1 if hasattr(ssl, 'TLSVersion') else ssl.PROTOCOL_TLSv1
-            context.max_version = ssl.TLSVersion.TLSv1_3 if hasattr(ssl, 'TLSVersion') else ssl.PROTOCOL_TLSv1_2
-        
-        # 禁用SSLv3
-        context.options |= ssl.OP_NO_SSLv3
-        
-        # 禁用证书验证（再次确认）
-        context.verify_mode = ssl.CERT_NONE
-        context.check_hostname = False
-        
-        # 使用更宽松的密码套件
-        try:
-            context.set_ciphers('DEFAULT@SECLEVEL=1')
-        except ssl.SSLError:
-            # 如果设置失败，使用默认密码套件
-            _LOGGER.warning("无法设置自定义密码套件，使用默认值")
-        
-        return context
-
-    def _get_register_info(self) -> str:
-        """获取注册信息"""
-        # 使用真实的IMEI（如果提供）
-        if self.imei:
-            imei = self.imei
-        else:
-            imei = self._generate_random_string(12)
-        
-        # 生成随机IMSI
-        imsi = self._generate_random_string(12)
-
-        register_data = {
-            "imei": imei,
-            "imsi": imsi,
-            "type": "Android",
-            "brand": "Xiaomi",
-            "bundle_id": "com.lancens.wxdoorbell",
-        }
 
-        return json.dumps(register_data, separators=(",", ":"))
+def _unlock_handler(method: str) -> PushHandler:
+    """指纹/密码开锁推送"""
 
-    def _generate_random_string(self, length: int) -> str:
-        """生成随机字符串"""
-        return "".join(
-            random.choices(
-                "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
-                k=length,
-            )
-        )
-
-    async def async_start(self):
-        """启动推送监听"""
-        if self._push_thread and self._push_thread.is_alive():
-            return
-
-        self._stop_event.clear()
-        self._push_thread = threading.Thread(
-            target=self._push_loop, name="DingDingPushThread", daemon=True
+    def handler(listener: "PushListener", event: PushEvent):
+        listener._fire_event(
+            EVENT_DOOR_UNLOCK,
+            {
+                "uid": event.uid,
+                "method": method,
+                "message": event.message,
+                "alert": event.alert,
+                "name": event.name,
+            },
         )
-        self._push_thread.start()
-        _LOGGER.info("推送监听器已启动")
-
-    async def async_stop(self):
-        """停止推送监听"""
-        self._stop_event.set()
-        self._disconnect()
 
-        if self._push_thread:
-            self._push_thread.join(timeout=5)
-
-        _LOGGER.info("推送监听器已停止")
-
-    def _push_loop(self):
-        """推送线程主循环"""
-        PushListener.release = False
-        _LOGGER.info("推送线程已启动")
-
-        while not self._stop_event.is_set():
-            try:
-                # 建立连接
-                if not self._connect():
-                    time.sleep(2)
-                    continue
+    return handler
+
+
+def _handle_lock(listener: "PushListener", event: PushEvent):
+    """门锁推送 - 从message或alert中判断开锁方法"""
+    unlock_method = "lock"
+    combined_message = f"{event.message} {event.alert}"
+    if "指纹开锁" in combined_message:
+        unlock_method = "fingerprint"
+    elif "密码开锁" in combined_message:
+        unlock_method = "password"
+    elif "门内开锁" in combined_message:
+        unlock_method = "inside_lock"
+
+    listener._fire_event(
+        EVENT_DOOR_UNLOCK,
+        {
+            "uid": event.uid,
+            "method": unlock_method,
+            "message": event.message,
+            "alert": event.alert,
+            "name": event.name,
+        },
+    )
 
-                # 发送注册信息
-                if not self._send_register():
-                    self._disconnect()
-                    continue
 
-                # 主消息循环
-                self._message_loop()
+def _event_handler(event_type: str) -> PushHandler:
+    """来电/上线/离线推送"""
 
-            except Exception as e:
-                _LOGGER.error("推送循环异常: %s", e)
-                self._disconnect()
-                time.sleep(5)
+    def handler(listener: "PushListener", event: PushEvent):
+        listener._fire_event(
+            event_type,
+            {
+                "uid": event.uid,
+                "message": event.message,
+                "alert": event.alert,
+                "name": event.name,
+            },
+        )
 
-        PushListener.release = True
-        _LOGGER.info("推送线程已停止")
+    return handler
 
-    def _connect(self) -> bool:
-        """连接到推送服务器"""
-        try:
-            _LOGGER.info("连接到推送服务器: %s:%d", self.push_host, self.push_port)
 
-            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            client_socket.settimeout(10)
+def _handle_alarm(listener: "PushListener", event: PushEvent):
+    """报警推送（移动侦测、低电量、温度、声音）"""
+    listener._fire_event(
+        EVENT_ALARM,
+        {
+            "uid": event.uid,
+            "type": event.type,
+            "message": event.message,
+            "alert": event.alert,
+            "name": event.name,
+        },
+    )
 
-            # 创建SSL socket
-            self._ssl_socket = self._ssl_context.wrap_socket(
-                client_socket, server_hostname=self.push_host
-            )
 
-            # 建立连接
-            self._ssl_socket.connect((self.push_host, self.push_port))
-            self._ssl_socket.settimeout(130)
+# 按推送类型修改设备数据，其他推送只更新最后活动时间（离线推送除外）
+PUSH_PATCHES: Dict[str, Dict[str, Any]] = {
+    PUSH_TYPE_ONLINE: {ATTR_ONLINE: True},
+    PUSH_TYPE_OFFLINE: {ATTR_ONLINE: False},
+    PUSH_TYPE_LOW_POWER: {ATTR_LOW_BATTERY: True},
+}
 
-            _LOGGER.info("已连接到推送服务器")
-            return True
+PUSH_HANDLERS: Dict[str, PushHandler] = {
+    PUSH_TYPE_FINGERPRINT_UNLOCK: _unlock_handler("fingerprint"),
+    PUSH_TYPE_PASSWORD_UNLOCK: _unlock_handler("password"),
+    PUSH_TYPE_LOCK: _handle_lock,
+    PUSH_TYPE_CALL: _event_handler(EVENT_DOOR_CALL),
+    PUSH_TYPE_OFFLINE: _event_handler(EVENT_DOOR_OFFLINE),
+    PUSH_TYPE_ONLINE: _event_handler(EVENT_DOOR_ONLINE),
+    PUSH_TYPE_PIR: _handle_alarm,
+    PUSH_TYPE_LOW_POWER: _handle_alarm,
+    PUSH_TYPE_LOW_TEMP_ALARM: _handle_alarm,
+    PUSH_TYPE_HIGH_TEMP_ALARM: _handle_alarm,
+    PUSH_TYPE_SOUND_ALARM: _handle_alarm,
+}
 
-        except ssl.SSLError as e:
-            _LOGGER.error("SSL握手失败: %s", e)
-            return False
-        except socket.error as e:
-            _LOGGER.error("连接失败: %s", e)
-            return False
-        except Exception as e:
-            _LOGGER.error("连接异常: %s", e)
-            return False
 
-    def _disconnect(self):
-        """断开连接"""
-        with self._socket_lock:
-            if self._ssl_socket:
-                try:
-                    self._ssl_socket.close()
-                except:
-                    pass
-                self._ssl_socket = None
+def register_handler(push_type: str, handler: PushHandler) -> Callable[[], None]:
+    """注册推送处理器（例如PUSH_TYPE_UART等未处理的类型），返回取消注册的函数
 
-        _LOGGER.info("已断开连接")
+    同一类型已有处理器时会被替换，取消注册后恢复原来的处理器。
+    """
+    previous = PUSH_HANDLERS.get(push_type)
+    PUSH_HANDLERS[push_type] = handler
 
-    def _send_register(self) -> bool:
-        """发送注册信息"""
-        try:
-            register_data = self._register_info.encode("utf-8")
-            _LOGGER.info("发送注册信息: %s", self._register_info)
-            result = self._send_message(self.CMD_REGISTER, register_data)
-            if result:
-                _LOGGER.info("注册信息发送成功")
-            else:
-                _LOGGER.error("注册信息发送失败")
-            return result
-        except Exception as e:
-            _LOGGER.error("发送注册信息失败: %s", e)
-            return False
+    def remove():
+        if PUSH_HANDLERS.get(push_type) is not handler:
+            return
+        if previous is None:
+            PUSH_HANDLERS.pop(push_type)
+        else:
+            PUSH_HANDLERS[push_type] = previous
 
-    def _message_loop(self):
-        """主消息处理循环"""
-        while not self._stop_event.is_set() and self._ssl_socket:
-            try:
-                # 接收消息头（8字节）
-                header = self._receive_data(8)
-                if not header:
-                    _LOGGER.warning("服务器关闭连接")
-                    break
-
-                # 解析命令和长度（小端序）
-                cmd, length = struct.unpack("<II", header)
-                _LOGGER.debug("收到命令: %d, 长度: %d", cmd, length)
-
-                # 接收消息体
-                data = self._receive_data(length) if length > 0 else b""
-
-                # 处理消息
-                self._handle_message(cmd, data)
-
-                # 发送心跳响应
-                if self._ssl_socket:
-                    if not self._send_heartbeat():
-                        _LOGGER.warning("发送心跳响应失败，连接可能已断开")
-                        break
-
-            except socket.timeout:
-                _LOGGER.info("发送心跳包")
-                if self._ssl_socket:
-                    if not self._send_heartbeat():
-                        _LOGGER.warning("发送心跳包失败，连接可能已断开")
-                        break
-                else:
-                    _LOGGER.warning("连接已断开，无法发送心跳包")
-                    break
-            except (ConnectionResetError, BrokenPipeError):
-                _LOGGER.warning("连接丢失")
-                break
-            except Exception as e:
-                _LOGGER.error("消息循环异常: %s", e)
-                break
-
-    def _handle_message(self, cmd: int, data: bytes):
-        """处理接收到的消息"""
-        try:
-            _LOGGER.debug("收到消息: cmd=%d, data_length=%d", cmd, len(data))
-            
-            if cmd == self.CMD_TOKEN:
-                _LOGGER.info("收到CMD_TOKEN命令")
-                token_data = json.loads(data.decode("utf-8"))
-                _LOGGER.debug("Token数据: %s", token_data)
-                token = token_data.get(self.FLAG_PUSH_CLIENT_TOKEN, "")
-                self.push_token = token
-                _LOGGER.info("收到token: %s", token)
-                
-                # 收到token后，绑定到服务器
-                asyncio.run_coroutine_threadsafe(
-                    self._bind_push_token(),
-                    self.hass.loop
-                )
+    return remove
 
-            elif cmd == self.CMD_PUSH:
-                _LOGGER.info("收到CMD_PUSH命令")
-                push_data = data.decode("utf-8")
-                push_info = json.loads(push_data)
-                _LOGGER.info("收到推送: %s", push_info)
 
-                # 在Home Assistant事件循环中处理推送
-                self.hass.loop.call_soon_threadsafe(
-                    lambda: self._handle_push_info(push_info)
-                )
+class PushListener:
+    """推送监听器（每个配置项一个，订阅所在区域的推送中心）"""
 
-            elif cmd == self.CMD_HEARTBEAT:
-                _LOGGER.debug("收到CMD_HEARTBEAT命令")
-                _LOGGER.debug("收到心跳响应")
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        api: DingDingAPI,
+        hub: PushHub,
+        device_uid: Optional[str] = None,
+        user_id: int = 0,
+        entry_id: Optional[str] = None,
+        bound_tokens: Optional[Tuple[str, str]] = None,
+    ):
+        self.hass = hass
+        self.api = api
+        self.hub = hub
+        self.device_uid = device_uid
+        self.user_id = user_id
+        self.entry_id = entry_id
+        self.push_token = None
+        # 本账号的设备UID，由协调器在刷新设备列表后更新，用于推送路由
+        self.uids: set = set()
+
+        # 上一次绑定成功的(推送token, API token)，两者都没变时不再请求绑定接口
+        self.bound_tokens = bound_tokens
+        # 绑定成功后的回调（用于持久化到配置项）
+        self.on_bound: Optional[Callable[[], None]] = None
+        self._bind_task: Optional[asyncio.Task] = None
+
+        # 实体就绪前收到的推送按顺序暂存，就绪后一次性分发
+        self._ready = False
+        self._pending: deque = deque(maxlen=PENDING_PUSH_LIMIT)
+
+        # 推送事件日志（由async_setup_entry打开）
+        self.journal: Optional[EventJournal] = None
+        # 启动过程计时（由async_setup_entry设置），记录推送token、绑定和第一条推送的时间
+        self.timeline: Optional[BootstrapTimeline] = None
+        self._journal_flush_timer: Optional[asyncio.TimerHandle] = None
+        self._journal_flush_job: Optional[asyncio.Future] = None
+
+        # 推送统计（收到推送到触发事件的延迟，用于比较两种传输模式）
+        self.stats = {
+            "pushes": 0,
+            "pending_flushed": 0,
+            "pending_dropped": 0,
+            "binds": 0,
+            "bind_skipped": 0,
+            "bind_failures": 0,
+            "fire_latency_ms_last": None,
+            "fire_latency_ms_avg": None,
+            "fire_latency_ms_max": None,
+        }
 
-            else:
-                _LOGGER.warning("未知命令: %d", cmd)
+    async def async_start(self):
+        """启动推送监听（订阅区域推送中心）"""
+        await self.hub.async_subscribe(self)
+        _LOGGER.info("推送监听器已启动")
 
-        except json.JSONDecodeError:
-            _LOGGER.error("JSON解析失败")
-        except UnicodeDecodeError:
-            _LOGGER.error("数据解码失败")
+    async def async_stop(self):
+        """停止推送监听（取消订阅，推送中心没有订阅者时自动停止）"""
+        if await self.hub.async_unsubscribe(self):
+            hubs = self.hass.data.get(DOMAIN, {}).get("hubs", {})
+            for region, hub in list(hubs.items()):
+                if hub is self.hub:
+                    hubs.pop(region)
+
+        if self._bind_task and not self._bind_task.done():
+            self._bind_task.cancel()
+        self._bind_task = None
+
+        # 关闭推送事件日志（等待正在进行的落盘完成）
+        if self._journal_flush_timer:
+            self._journal_flush_timer.cancel()
+            self._journal_flush_timer = None
+        if self._journal_flush_job:
+            await self._journal_flush_job
+        if self.journal:
+            await self.hass.async_add_executor_job(self.journal.close)
+        self._ready = False
+        self._pending.clear()
+        _LOGGER.info("推送监听器已停止")
 
-    async def _bind_push_token(self):
-        """绑定推送token到服务器"""
+    def accepts(self, uid: Optional[str]) -> bool:
+        """判断推送是否属于本配置项"""
+        if self.device_uid:
+            return uid == self.device_uid
+        return uid in self.uids
+
+    @callback
+    def on_push_token(self, token: str):
+        """推送中心收到新的推送token（在Home Assistant事件循环中）"""
+        self.push_token = token
+        self._mark("push_token")
+        self.async_bind()
+
+    @callback
+    def async_bind(self):
+        """在后台绑定推送token（推送token或API token变化后调用，已在绑定时忽略）"""
         if not self.push_token:
-            _LOGGER.error("推送token为空，无法绑定")
-            return
-
-        if not self.api.token:
-            _LOGGER.error("API token为空，无法绑定推送token")
             return
+        if self._bind_task is None or self._bind_task.done():
+            # 绑定失败时一直退避重试，不能让Home Assistant启动等待它
+            self._bind_task = create_background_task(
+                self.hass, self._bind_push_token(), f"dingding_smart_bind_{self.entry_id}"
+            )
 
-        if self._bind_completed:
-            _LOGGER.debug("推送token已绑定，跳过重复绑定")
+    @callback
+    def on_push(self, event: PushEvent, received: Optional[float] = None):
+        """推送中心分发的推送（在Home Assistant事件循环中）"""
+        self._mark("first_push")
+        if not self._ready:
+            if len(self._pending) == self._pending.maxlen:
+                self.stats["pending_dropped"] += 1
+                _LOGGER.warning("实体就绪前暂存的推送过多，丢弃最早的推送")
+            self._pending.append((event, received))
             return
-
-        _LOGGER.info("开始绑定推送token到服务器")
-        success = await self.api.bind_push_token(self.push_token)
-        if success:
-            _LOGGER.info("推送token绑定成功")
-            self._bind_completed = True
-        else:
-            _LOGGER.error("推送token绑定失败")
-
-    def _handle_push_info(self, push_info: dict):
+        self._handle_push_info(event, received)
+
+    @callback
+    def async_set_ready(self):
+        """实体平台已就绪，按接收顺序分发暂存的推送"""
+        self._ready = True
+        self._mark("entities_ready")
+        pending = self._pending
+        if pending:
+            _LOGGER.info("分发实体就绪前暂存的%d条推送", len(pending))
+            self.stats["pending_flushed"] += len(pending)
+        while pending:
+            self._handle_push_info(*pending.popleft())
+
+    def _mark(self, milestone: str):
+        if self.timeline is not None:
+            self.timeline.mark(milestone)
+
+    def _handle_push_info(self, event: PushEvent, received: Optional[float] = None):
         """处理推送信息（在Home Assistant事件循环中）"""
-        event_type = push_info.get("type")
-        uid = push_info.get("uid")
-        message = push_info.get("message", "")
-        alert = push_info.get("alert", "")
-        name = push_info.get("name", "")
-
-        # 检查aps字段中的消息内容
-        if "aps" in push_info:
-            aps = push_info.get("aps", {})
-            if message == "" and "message" in aps:
-                message = aps.get("message", "")
-            if alert == "" and "alert" in aps:
-                alert = aps.get("alert", "")
-            if name == "" and "name" in aps:
-                name = aps.get("name", "")
-
         # 过滤设备UID
-        if self.device_uid and uid != self.device_uid:
+        if self.device_uid and event.uid != self.device_uid:
             return
 
-        _LOGGER.info("处理推送事件: type=%s, uid=%s, message=%s, alert=%s, name=%s", event_type, uid, message, alert, name)
-
-        # 触发Home Assistant事件
-        if event_type == PUSH_TYPE_FINGERPRINT_UNLOCK:
-            self._fire_event(
-                EVENT_DOOR_UNLOCK,
-                {
-                    "uid": uid,
-                    "method": "fingerprint",
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type == PUSH_TYPE_PASSWORD_UNLOCK:
-            self._fire_event(
-                EVENT_DOOR_UNLOCK,
-                {
-                    "uid": uid,
-                    "method": "password",
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type == PUSH_TYPE_LOCK:
-            # 门锁事件 - 从message或alert中判断开锁方法
-            unlock_method = "lock"
-            combined_message = message + " " + alert
-            if "指纹开锁" in combined_message:
-                unlock_method = "fingerprint"
-            elif "密码开锁" in combined_message:
-                unlock_method = "password"
-            elif "门内开锁" in combined_message:
-                unlock_method = "inside_lock"
-                
-            self._fire_event(
-                EVENT_DOOR_UNLOCK,
-                {
-                    "uid": uid,
-                    "method": unlock_method,
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type == PUSH_TYPE_CALL:
-            self._fire_event(
-                EVENT_DOOR_CALL,
-                {
-                    "uid": uid,
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type == PUSH_TYPE_OFFLINE:
-            self._fire_event(
-                EVENT_DOOR_OFFLINE,
-                {
-                    "uid": uid,
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type == PUSH_TYPE_ONLINE:
-            self._fire_event(
-                EVENT_DOOR_ONLINE,
-                {
-                    "uid": uid,
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-        elif event_type in [
-            PUSH_TYPE_PIR,
-            PUSH_TYPE_LOW_POWER,
-            PUSH_TYPE_LOW_TEMP_ALARM,
-            PUSH_TYPE_HIGH_TEMP_ALARM,
-            PUSH_TYPE_SOUND_ALARM,
-        ]:
-            self._fire_event(
-                EVENT_ALARM,
-                {
-                    "uid": uid,
-                    "type": event_type,
-                    "message": message,
-                    "alert": alert,
-                    "name": name,
-                },
-            )
-
-    def _fire_event(self, event_type: str, event_data: dict):
-        """触发Home Assistant事件"""
-        self.hass.bus.async_fire(event_type, event_data)
-        _LOGGER.debug("触发事件: %s, 数据: %s", event_type, event_data)
-
-    async def _bind_push_token(self):
-        """绑定推送Token到服务器"""
-        if self._bind_completed:
-            return
-        
-        if not self.push_token:
-            _LOGGER.warning("没有可用的push_token，无法绑定")
-            return
+        _LOGGER.info(
+            "处理推送事件: type=%s, uid=%s, message=%s, alert=%s, name=%s",
+            event.type, event.uid, event.message, event.alert, event.name,
+        )
 
-        try:
-            _LOGGER.info("开始绑定推送Token到服务器")
-            
-            # 步骤1: 登录获取http_token
-            if not self.api.token:
-                await self.api.login()
-            
-            self.http_token = self.api.token
-            if not self.http_token:
-                _LOGGER.error("登录失败，无法获取http_token")
-                return
-
-            _LOGGER.info("登录成功，获取到http_token")
-
-            # 步骤2: 绑定来电推送token
-            call_success = await self._bind_call_push_token()
-            if not call_success:
-                _LOGGER.error("绑定来电推送token失败，停止绑定流程")
-                return
-
-            # 步骤3: 绑定消息推送token
-            notify_success = await self._bind_notify_push_token()
-            if not notify_success:
-                _LOGGER.error("绑定消息推送token失败，停止绑定流程")
-                return
-
-            self._bind_completed = True
-            _LOGGER.info("推送Token绑定完成")
-
-        except Exception as e:
-            _LOGGER.error("绑定推送Token失败: %s", e)
-
-    async def _bind_call_push_token(self):
-        """绑定来电推送token"""
-        if not self.http_token or not self.push_token:
-            return
+        # 按推送类型查表分发
+        handler = PUSH_HANDLERS.get(event.type)
+        if handler is not None:
+            handler(self, event)
+        else:
+            _LOGGER.debug("未处理的推送类型: %s", event.type)
 
-        url = f"{self.api.api_host}v1/api/user/token"
-        
-        headers = {
-            "baseUrl": "formal",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "bundleid": "com.lancens.wxdoorbell",
-            "Token": self.http_token
-        }
+        self._patch_device(event, received)
 
-        data = {
-            "push_token": self.push_token,
-            "push_platform": "android",
-            "language": "zh",
-            "os_token": "",
-            "os": "Android",
-            "os_push_version": 1,
-            "bundleid": "com.lancens.wxdoorbell",
-            "phone_model": "phone:Xiaomi_Mi_10/App:钉钉智能_1.0.0/Android_11"
-        }
+        if received is not None:
+            self._record_fire_latency(time.monotonic() - received)
 
-        try:
-            session = await self.api._get_session()
-            async with session.post(url, json=data, headers=headers) as resp:
-                if 200 <= resp.status < 300:
-                    result = await resp.json()
-                    if result.get("message") == "success":
-                        _LOGGER.info("绑定来电推送token成功")
-                        return True
-                    else:
-                        _LOGGER.error("绑定来电推送token失败: %s", result)
-                        return False
-                else:
-                    _LOGGER.error("绑定来电推送token失败: HTTP %s", resp.status)
-                    return False
-        except Exception as e:
-            _LOGGER.error("绑定来电推送token异常: %s", e)
-            return False
-
-    async def _bind_notify_push_token(self):
-        """绑定消息推送token"""
-        if not self.http_token or not self.push_token:
+    def _patch_device(self, event: PushEvent, received: Optional[float]):
+        """按推送修改协调器中的设备数据（在线状态、低电量、最后活动时间）"""
+        if not event.uid:
             return
+        patch = dict(PUSH_PATCHES.get(event.type, ()))
+        if event.type != PUSH_TYPE_OFFLINE:
+            seen = dt_util.utcnow()
+            if received is not None:
+                seen -= timedelta(seconds=time.monotonic() - received)
+            patch[ATTR_LAST_SEEN] = seen.isoformat()
+        async_dispatcher_send(self.hass, signal_device_patch(self.entry_id), event.uid, patch)
+
+    def _record_fire_latency(self, latency: float):
+        """记录从收到推送到触发事件的延迟"""
+        stats = self.stats
+        latency_ms = latency * 1000
+        stats["pushes"] += 1
+        stats["fire_latency_ms_last"] = latency_ms
+        if stats["fire_latency_ms_avg"] is None:
+            stats["fire_latency_ms_avg"] = latency_ms
+            stats["fire_latency_ms_max"] = latency_ms
+        else:
+            # 指数滑动平均
+            stats["fire_latency_ms_avg"] += (latency_ms - stats["fire_latency_ms_avg"]) * 0.1
+            stats["fire_latency_ms_max"] = max(stats["fire_latency_ms_max"], latency_ms)
 
-        url = f"{self.api.api_host}v1/api/user/message/token"
-        
-        headers = {
-            "baseUrl": "formal",
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Connection": "close",
-            "bundleid": "com.lancens.wxdoorbell",
-            "Token": self.http_token
-        }
-
-        data = {
-            "push_token": self.push_token,
-            "push_platform": "android",
-            "language": "zh",
-            "os_token": "",
-            "os": "Android",
-            "os_push_version": 1,
-            "bundleid": "com.lancens.wxdoorbell",
-            "phone_model": "phone:Xiaomi_Mi_10/App:钉钉智能_1.0.0/Android_11"
-        }
+    def _fire_event(self, event_type: str, event_data: dict):
+        """触发Home Assistant事件，通知该设备的实体，并写入推送事件日志"""
+        self.hass.bus.async_fire(event_type, event_data)
+        _LOGGER.debug("触发事件: %s, 数据: %s", event_type, event_data)
+        async_dispatcher_send(
+            self.hass, signal_push(self.entry_id, event_data.get("uid"), event_type), event_data
+        )
 
-        try:
-            session = await self.api._get_session()
-            async with session.post(url, json=data, headers=headers) as resp:
-                if 200 <= resp.status < 300:
-                    result = await resp.json()
-                    if result.get("message") == "success":
-                        _LOGGER.info("绑定消息推送token成功")
-                        return True
-                    else:
-                        _LOGGER.error("绑定消息推送token失败: %s", result)
-                        return False
-                else:
-                    _LOGGER.error("绑定消息推送token失败: HTTP %s", resp.status)
-                    return False
-        except Exception as e:
-            _LOGGER.error("绑定消息推送token异常: %s", e)
-            return False
+        if self.journal is not None and self.journal.append(event_type, event_data):
+            if self._journal_flush_timer is None:
+                self._journal_flush_timer = self.hass.loop.call_later(
+                    JOURNAL_FLUSH_INTERVAL, self._flush_journal
+                )
 
-    def _send_message(self, cmd: int, data: bytes) -> bool:
-        """发送消息到服务器"""
-        with self._socket_lock:
-            if not self._ssl_socket:
-                return False
+    @callback
+    def _flush_journal(self):
+        """在执行器中批量落盘推送事件日志"""
+        self._journal_flush_timer = None
+        if self._journal_flush_job is None or self._journal_flush_job.done():
+            self._journal_flush_job = self.hass.async_add_executor_job(self.journal.flush)
 
-            try:
-                # 构造消息头（小端序）
-                header = struct.pack("<II", cmd, len(data))
-                self._ssl_socket.sendall(header + data)
-                _LOGGER.debug("发送命令: %d, 长度: %d", cmd, len(data))
-                return True
-            except (OSError, BrokenPipeError) as e:
-                _LOGGER.error("发送失败: %s", e)
-                self._disconnect()
-                return False
-
-    def _send_heartbeat(self) -> bool:
-        """发送心跳包"""
-        return self._send_message(self.CMD_HEARTBEAT, b"")
-
-    def _receive_data(self, length: int) -> bytes:
-        """接收指定长度的数据"""
-        data = b""
-        while len(data) < length:
-            try:
-                chunk = self._ssl_socket.recv(length - len(data))
-                if not chunk:
-                    return None
-                data += chunk
-            except (OSError, BrokenPipeError) as e:
-                _LOGGER.error("接收数据失败: %s", e)
-                self._disconnect()
-                return None
-        return data
+    async def _bind_push_token(self):
+        """绑定推送token到服务器，失败时按退避时间重试直到成功"""
+        attempt = 0
+        while self.push_token:
+            if not await self.api.ensure_token():
+                _LOGGER.error("登录失败，无法绑定推送token")
+            else:
+                tokens = (self.push_token, self.api.token)
+                if tokens == self.bound_tokens:
+                    self.stats["bind_skipped"] += 1
+                    self._mark("push_bound")
+                    _LOGGER.debug("推送token已绑定，跳过重复绑定")
+                    return
+
+                _LOGGER.info("开始绑定推送token到服务器")
+                self.stats["binds"] += 1
+                if await self.api.bind_push_token(tokens[0]):
+                    self.bound_tokens = tokens
+                    self._mark("push_bound")
+                    if self.on_bound is not None:
+                        self.on_bound()
+                    return
+
+            self.stats["bind_failures"] += 1
+            attempt += 1
+            delay = random.random() * min(
+                BIND_RETRY_MAX_DELAY, BIND_RETRY_BASE_DELAY * 2 ** min(attempt, 16)
+            )
+            _LOGGER.warning("推送token绑定失败，%.0f秒后重试", delay)
+            await asyncio.sleep(delay)
 
 
 class DingDingCoordinator(DataUpdateCoordinator):
@@ -1090,39 +1464,317 @@ class DingDingCoordinator(DataUpdateCoordinator):
         hass: HomeAssistant,
         api: DingDingAPI,
         push_listener: PushListener,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        store: Optional[Store] = None,
     ):
         self.api = api
         self.push_listener = push_listener
+        self.entry_id = push_listener.entry_id
         self.devices = []
         self.last_unlock_event = None
 
+        # 设备索引和实体快照缓存，设备数据变化时递增该设备的版本号，快照随之失效
+        self.device_index: Dict[str, dict] = {}
+        self._device_versions: Dict[str, int] = {}
+        self._snapshots: Dict[tuple, tuple] = {}
+
+        # 按变化通知实体：实体以context注册监听（设备UID或(UID, 字段)），
+        # 只通知context在本次变化集合中的实体；为None时通知全部实体
+        self._changed: Optional[Set[Hashable]] = None
+        self._notified_success: Optional[bool] = None
+        self.stats = {
+            "writes_performed": 0,
+            "writes_skipped": 0,
+            "full_updates": 0,
+            "push_patches": 0,
+            "push_patches_unchanged": 0,
+        }
+
+        # 推送对设备数据的修改，轮询设备列表后重新合并（低电量标记在电量回升后清除）
+        self._patches: Dict[str, Dict[str, Any]] = {}
+        self._low_battery_levels: Dict[str, Any] = {}
+        # 在线状态推送的[推送后第一次轮询到的dev_update_time（尚未轮询时为None）, time.monotonic()]
+        self._online_marks: Dict[str, list] = {}
+
+        # 设备列表缓存（接口返回的原始数据），synced为是否已从服务器获取过设备列表
+        self._store = store
+        self._api_devices: list = []
+        self.synced = False
+
+        # 启动过程计时（由async_setup_entry设置），记录第一次登录和获取设备列表的用时
+        self.timeline: Optional[BootstrapTimeline] = None
+
+        # 设备列表自适应轮询，数据没有变化时逐次延长间隔
+        self._poll_interval = poll_interval
+        self.poll = PollPolicy(poll_interval)
+
         super().__init__(
             hass,
             _LOGGER,
             name=DOMAIN,
-            update_interval=None,
+            update_interval=self._poll_delta(),
         )
 
     async def _async_update_data(self) -> dict:
         """更新数据"""
-        # 登录
-        if not self.api.token:
-            if not await self.api.login():
-                _LOGGER.error("登录失败，无法获取设备列表")
-                return {"devices": [], "last_unlock": self.last_unlock_event}
-
-        # 获取设备列表
-        self.devices = await self.api.get_device_list()
+        self._changed = None
+
+        # Home Assistant启动过程中不轮询（首次获取设备列表除外），沿用已有数据
+        if self.synced and self.hass.state is not CoreState.running:
+            self.poll.record_skipped()
+            self._changed = set()
+            return self.data
+
+        # 登录（token即将过期时续期）
+        with self._phase("login"):
+            logged_in = await self.api.ensure_token()
+        if not logged_in:
+            _LOGGER.error("登录失败，无法获取设备列表")
+            return self._keep_data()
+
+        # 获取设备列表（合并推送修改的字段），失败时保留已有的设备数据
+        try:
+            with self._phase("device_list"):
+                devices = await self.api.get_device_list(raise_errors=True)
+        except DingDingApiError as err:
+            _LOGGER.error("获取设备列表失败: %s", err)
+            return self._keep_data()
+
+        self.synced = True
+        self._changed = self._index_devices(devices)
+        self._set_devices()
+        if self._changed and devices != self._api_devices:
+            self._api_devices = devices
+            if self._store is not None:
+                self._store.async_delay_save(self._cache_data, DEVICE_CACHE_SAVE_DELAY)
+
+        self.poll.record_poll(bool(self._changed))
+        self.update_interval = self._poll_delta()
 
         return {
             "devices": self.devices,
             "last_unlock": self.last_unlock_event,
         }
 
+    def _phase(self, name: str):
+        """启动阶段计时，没有计时器时不记录"""
+        return self.timeline.phase(name) if self.timeline is not None else nullcontext()
+
+    def _keep_data(self) -> dict:
+        """本次没有获取到设备列表，沿用已有的设备数据"""
+        self._changed = set()
+        if self.data is not None:
+            return self.data
+        return {"devices": self.devices, "last_unlock": self.last_unlock_event}
+
+    def _set_devices(self):
+        """设备索引更新后同步设备列表和推送监听的设备UID"""
+        self.devices = list(self.device_index.values())
+        self.push_listener.uids = set(self.device_index)
+
+    async def async_load_cache(self) -> bool:
+        """从缓存加载上一次获取的设备列表，没有缓存时返回False"""
+        if self._store is None:
+            return False
+        try:
+            cached = await self._store.async_load()
+        except Exception as err:
+            _LOGGER.warning("读取设备列表缓存失败: %s", err)
+            return False
+        devices = cached.get("devices") if isinstance(cached, dict) else None
+        if not devices or not isinstance(devices, list):
+            return False
+
+        self._api_devices = devices
+        self._index_devices(devices)
+        self._set_devices()
+        self.data = {"devices": self.devices, "last_unlock": self.last_unlock_event}
+        _LOGGER.info(
+            "从缓存加载%d个设备（保存于%s），在后台刷新设备列表", len(devices), cached.get("saved_at")
+        )
+        return True
+
+    async def async_save_cache(self):
+        """立即保存设备列表缓存"""
+        if self._store is not None and self._api_devices:
+            await self._store.async_save(self._cache_data())
+
+    @callback
+    def _cache_data(self) -> dict:
+        return {"devices": self._api_devices, "saved_at": dt_util.utcnow().isoformat()}
+
+    def _poll_delta(self) -> Optional[timedelta]:
+        """下一次轮询的间隔，关闭轮询时为None"""
+        if not self.poll.enabled:
+            return None
+        return timedelta(seconds=self.poll.next_interval())
+
+    def set_poll_interval(self, poll_interval: float):
+        """修改基础轮询间隔"""
+        if poll_interval == self._poll_interval:
+            return
+        self._poll_interval = poll_interval
+        self.poll.set_base(poll_interval)
+        self.update_interval = self._poll_delta()
+        _LOGGER.info("设备列表轮询间隔修改为%s秒", self.poll.base_interval)
+        # 按新的间隔重新计划下一次轮询
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_boost_polling(self, event_data: dict):
+        """设备上线/离线，立即刷新一次并在一段时间内缩短轮询间隔"""
+        if not self.poll.enabled:
+            return
+        self.poll.boost()
+        self.update_interval = self._poll_delta()
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def get_device(self, uid: str) -> Optional[dict]:
+        """按UID获取设备数据"""
+        return self.device_index.get(uid)
+
+    def snapshot(self, uid: str, key: Hashable, builder: Callable[[Optional[dict]], Any]) -> Any:
+        """获取设备的实体快照，设备数据没有变化时直接返回缓存"""
+        version = self._device_versions.get(uid, 0)
+        cached = self._snapshots.get((uid, key))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = builder(self.device_index.get(uid))
+        self._snapshots[(uid, key)] = (version, value, builder)
+        return value
+
+    def _index_devices(self, devices: list) -> Set[Hashable]:
+        """重建设备索引，返回变化集合
+
+        包含数据有变化（新增、修改、移除）的设备UID，以及这些设备中快照值变化的(UID, 快照键)。
+        """
+        index = {device.get("uid"): device for device in devices}
+        self._merge_patches(index)
+        previous = self.device_index
+        changed: Set[Hashable] = {
+            uid for uid, device in index.items() if previous.get(uid) != device
+        }
+        changed.update(uid for uid in previous if uid not in index)
+
+        self.device_index = index
+        return self._refresh_snapshots(changed)
+
+    def _merge_patches(self, index: Dict[str, dict]):
+        """把推送修改的字段合并到新的设备数据中"""
+        for uid in list(self._patches):
+            device = index.get(uid)
+            if device is None:
+                # 设备已移除
+                self._patches.pop(uid)
+                self._low_battery_levels.pop(uid, None)
+                self._online_marks.pop(uid, None)
+                continue
+            patch = self._patches[uid]
+            if ATTR_ONLINE in patch and self._online_expired(uid, device):
+                # 推送之后设备又向服务器上报过（或推送已太久），丢失的上线/离线推送不会让状态一直错误
+                patch.pop(ATTR_ONLINE)
+                self._online_marks.pop(uid, None)
+            if ATTR_LOW_BATTERY in patch and uid in self._low_battery_levels:
+                level = self._low_battery_levels[uid]
+                battery = device.get("battery")
+                if isinstance(level, (int, float)) and isinstance(battery, (int, float)) and battery > level:
+                    # 电量回升（已充电或更换电池）
+                    patch.pop(ATTR_LOW_BATTERY)
+                    self._low_battery_levels.pop(uid)
+            index[uid] = {**device, **patch}
+
+    def _refresh_snapshots(self, changed: Set[Hashable]) -> Set[Hashable]:
+        """递增变化设备的版本号，重新生成快照并与旧值比较，返回加上快照值变化的(UID, 快照键)的变化集合"""
+        if not changed:
+            return changed
+        versions = self._device_versions
+        for uid in changed:
+            versions[uid] = versions.get(uid, 0) + 1
+
+        # 只有快照值变化的实体需要写状态
+        index = self.device_index
+        for (uid, key), (_, value, builder) in list(self._snapshots.items()):
+            if uid not in changed:
+                continue
+            new_value = builder(index.get(uid))
+            self._snapshots[(uid, key)] = (versions[uid], new_value, builder)
+            if new_value != value:
+                changed.add((uid, key))
+        return changed
+
+    def _online_expired(self, uid: str, device: dict) -> bool:
+        """推送修改的在线状态是否已被轮询结果取代
+
+        推送后的第一次轮询（通常是上线/离线推送触发的立即刷新）拿到的可能是设备掉线前上报的数据，
+        只把它的dev_update_time记为基准，之后dev_update_time再变化才说明设备又向服务器上报过。
+        """
+        mark = self._online_marks.get(uid)
+        if mark is None:
+            return False
+        reference, patched_at = mark
+        polled = device.get("dev_update_time")
+        if polled is None:
+            return time.monotonic() - patched_at > ONLINE_PATCH_MAX_AGE
+        if reference is None:
+            mark[0] = polled
+            return False
+        return polled != reference
+
+    @callback
+    def async_apply_patch(self, uid: str, patch: Dict[str, Any]):
+        """按推送直接修改设备数据并通知有变化的实体，不请求设备列表接口"""
+        device = self.device_index.get(uid)
+        if device is None:
+            return
+        if ATTR_LOW_BATTERY in patch and not device.get(ATTR_LOW_BATTERY):
+            self._low_battery_levels[uid] = device.get("battery")
+        if ATTR_ONLINE in patch:
+            self._online_marks[uid] = [None, time.monotonic()]
+        self._patches.setdefault(uid, {}).update(patch)
+
+        patched = {**device, **patch}
+        if patched == device:
+            self.stats["push_patches_unchanged"] += 1
+            return
+        self.stats["push_patches"] += 1
+        self.device_index[uid] = patched
+        self.devices = list(self.device_index.values())
+        self._changed = self._refresh_snapshots({uid})
+        self.async_update_listeners()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """通知实体更新，只通知数据有变化的实体
+
+        首次更新、更新成功/失败状态变化（影响实体可用性）或变化集合未知时通知全部实体。
+        """
+        changed, self._changed = self._changed, None
+        success = self.last_update_success
+        if changed is None or success != self._notified_success:
+            self._notified_success = success
+            self.stats["full_updates"] += 1
+            self.stats["writes_performed"] += len(self._listeners)
+            super().async_update_listeners()
+            return
+
+        performed = skipped = 0
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or context in changed:
+                update_callback()
+                performed += 1
+            else:
+                skipped += 1
+        self.stats["writes_performed"] += performed
+        self.stats["writes_skipped"] += skipped
+
+    @callback
     def update_unlock_event(self, event_data: dict):
-        """更新最新开门事件"""
+        """更新最新开门事件（在Home Assistant事件循环中）"""
+        previous = self.last_unlock_event
         self.last_unlock_event = event_data
-        # 在Home Assistant事件循环中更新监听器
-        self.hass.loop.call_soon_threadsafe(
-            lambda: self.async_update_listeners()
-        )
+        # 只有上一条和这一条开门事件所属设备的"最新开门"传感器需要更新
+        changed: Set[Hashable] = {(event_data.get("uid"), LAST_UNLOCK_CONTEXT)}
+        if previous:
+            changed.add((previous.get("uid"), LAST_UNLOCK_CONTEXT))
+        self._changed = changed
+        self.async_update_listeners()
@@ -0,0 +1,121 @@
+"""叮叮智能门铃 - API token管理
+
+根据登录返回的time字段推算token过期时间，过期前主动续期：
+优先使用reflash_key刷新（服务器不支持时自动停用），否则用账号密码重新登录。
+同一账号同时只有一次登录/刷新在进行，并发调用方共享同一个结果。
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_LIFETIME = 7 * 24 * 3600.0  # 秒，time字段为签发时间时假定的有效期
+DEFAULT_REFRESH_MARGIN = 3600.0  # 秒，距离过期不足该时间时主动续期
+MIN_PLAUSIBLE_STAMP = 1e9  # 早于2001年的值不是时间戳（可能是时长或计数）
+
+
+def parse_token_expiry(
+    value: Any, now: float, lifetime: float = DEFAULT_TOKEN_LIFETIME
+) -> Optional[float]:
+    """根据登录返回的time字段推算过期时间（Unix时间戳，秒）
+
+    time可能是秒或毫秒时间戳；晚于当前时间视为过期时间，否则视为签发时间。
+    无法解析时按刚签发处理；数值不像时间戳时返回None（过期时间未知，不主动续期，
+    token失效时由请求流程重新登录）。
+    """
+    try:
+        stamp = float(value)
+    except (TypeError, ValueError):
+        return now + lifetime
+    if stamp > 1e12:
+        stamp /= 1000
+    if stamp < MIN_PLAUSIBLE_STAMP:
+        return None
+    if stamp > now:
+        return stamp
+    return stamp + lifetime
+
+
+class TokenManager:
+    """API token生命周期管理"""
+
+    def __init__(
+        self,
+        login: Callable[[], Awaitable[bool]],
+        refresh: Callable[[], Awaitable[Optional[bool]]],
+        lifetime: float = DEFAULT_TOKEN_LIFETIME,
+        refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._login = login
+        self._refresh = refresh
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        self._task: Optional[asyncio.Future] = None
+
+        self.expires_at: Optional[float] = None
+        # 服务器是否支持reflash_key刷新（None为未知）
+        self.refresh_supported: Optional[bool] = None
+
+        # 计数器
+        self.logins = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.coalesced = 0
+
+    def set_issued(self, time_value: Any):
+        """登录/刷新成功，根据time字段更新过期时间"""
+        self.expires_at = parse_token_expiry(time_value, self._clock(), self.lifetime)
+
+    def expiring(self) -> bool:
+        """token是否已过期或即将过期"""
+        if self.expires_at is None:
+            return False
+        return self._clock() >= self.expires_at - self.refresh_margin
+
+    async def ensure_valid(self, token: Optional[str]) -> bool:
+        """确保有可用的token，没有或即将过期时续期"""
+        if token and not self.expiring():
+            return True
+        return await self.renew(prefer_refresh=bool(token))
+
+    async def renew(self, prefer_refresh: bool = False) -> bool:
+        """续期token（登录进行中时等待同一次登录的结果）"""
+        task = self._task
+        if task is not None and not task.done():
+            self.coalesced += 1
+        else:
+            task = self._task = asyncio.ensure_future(self._renew(prefer_refresh))
+        return await asyncio.shield(task)
+
+    async def _renew(self, prefer_refresh: bool) -> bool:
+        if prefer_refresh and self.refresh_supported is not False:
+            self.refreshes += 1
+            result = await self._refresh()
+            if result:
+                self.refresh_supported = True
+                return True
+            self.refresh_failures += 1
+            if result is None:
+                # 服务器不支持刷新接口，以后直接重新登录
+                _LOGGER.info("服务器不支持reflash_key刷新token，改为重新登录")
+                self.refresh_supported = False
+        self.logins += 1
+        return await self._login()
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        remaining = None
+        if self.expires_at is not None:
+            remaining = round(self.expires_at - self._clock())
+        return {
+            "expires_in": remaining,
+            "refresh_supported": self.refresh_supported,
+            "logins": self.logins,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "coalesced": self.coalesced,
+        }
@@ -4,11 +4,12 @@ from datetime import datetime, timedelta
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, Event, callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN, DingDingCoordinator, EVENT_DOOR_UNLOCK
+from . import DOMAIN, DingDingCoordinator, EVENT_DOOR_UNLOCK, signal_push
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -40,10 +41,14 @@ async def async_setup_entry(
 
 
 class DoorLockSensor(CoordinatorEntity, BinarySensorEntity):
-    """门内开锁状态传感器"""
+    """门内开锁状态传感器
+
+    状态只来自开门推送，不使用设备数据：监听context为(设备UID, 实体类型)且不生成快照，
+    设备数据变化时协调器不通知该实体（只在全部通知时更新可用性）。
+    """
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=(uid, type(self)))
         self._uid = uid
         self._name = name
         self._attr_unique_id = f"{DOMAIN}_{uid}_door_lock"
@@ -59,32 +64,30 @@ class DoorLockSensor(CoordinatorEntity, BinarySensorEntity):
         return self._is_unlocked
 
     @callback
-    def _handle_door_unlock_event(self, event: Event):
-        """处理门内开锁事件"""
-        if event.data.get("uid") == self._uid:
-            method = event.data.get("method", "unknown")
-            
-            # 只处理门内开锁事件
-            if method == "inside_lock":
-                self._is_unlocked = True
-                self._last_unlock_time = datetime.now()
-                method_display = "门内开锁"
-                
-                _LOGGER.info(
-                    "门内开锁状态更新: %s - 开锁",
-                    self._name
-                )
-                self.async_write_ha_state()
-                
-                # 取消之前的定时器
-                if self._cancel_timer:
-                    self._cancel_timer.cancel()
-                
-                # 5秒后自动恢复为关闭状态
-                self._cancel_timer = self.hass.loop.call_later(
-                    5, 
-                    self._auto_lock
-                )
+    def _handle_door_unlock_event(self, event_data: dict):
+        """处理本设备的门内开锁事件"""
+        method = event_data.get("method", "unknown")
+
+        # 只处理门内开锁事件
+        if method == "inside_lock":
+            self._is_unlocked = True
+            self._last_unlock_time = datetime.now()
+
+            _LOGGER.info(
+                "门内开锁状态更新: %s - 开锁",
+                self._name
+            )
+            self.async_write_ha_state()
+
+            # 取消之前的定时器
+            if self._cancel_timer:
+                self._cancel_timer.cancel()
+
+            # 5秒后自动恢复为关闭状态
+            self._cancel_timer = self.hass.loop.call_later(
+                5,
+                self._auto_lock
+            )
 
     @callback
     def _auto_lock(self):
@@ -94,32 +97,35 @@ class DoorLockSensor(CoordinatorEntity, BinarySensorEntity):
         self.async_write_ha_state()
         self._cancel_timer = None
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """处理协调器更新"""
-        # 监听开门事件
-        if not hasattr(self, "_event_listener"):
-            self._event_listener = self.hass.bus.async_listen(
-                EVENT_DOOR_UNLOCK, 
-                self._handle_door_unlock_event
-            )
-        self.async_write_ha_state()
-
     async def async_added_to_hass(self):
         """当实体添加到Home Assistant时"""
         await super().async_added_to_hass()
-        # 监听开门事件
-        self._event_listener = self.hass.bus.async_listen(
-            EVENT_DOOR_UNLOCK, 
-            self._handle_door_unlock_event
+        # 只监听本设备的开门事件
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                signal_push(self.coordinator.entry_id, self._uid, EVENT_DOOR_UNLOCK),
+                self._handle_door_unlock_event,
+            )
         )
 
+    async def async_will_remove_from_hass(self):
+        """当实体从Home Assistant移除时"""
+        # 取消定时器
+        if self._cancel_timer:
+            self._cancel_timer.cancel()
+            self._cancel_timer = None
+        await super().async_will_remove_from_hass()
+
 
 class OutsideDoorUnlockSensor(CoordinatorEntity, BinarySensorEntity):
-    """门外开门状态传感器"""
+    """门外开门状态传感器
+
+    属性中的设备字段按快照缓存，监听context为(设备UID, 实体类型)，只有这些字段变化时才更新。
+    """
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=(uid, type(self)))
         self._uid = uid
         self._name = name
         self._attr_unique_id = f"{DOMAIN}_{uid}_outside_door_unlock"
@@ -135,38 +141,37 @@ class OutsideDoorUnlockSensor(CoordinatorEntity, BinarySensorEntity):
         return self._is_unlocked
 
     @callback
-    def _handle_door_unlock_event(self, event: Event):
-        """处理门外开锁事件"""
-        if event.data.get("uid") == self._uid:
-            method = event.data.get("method", "unknown")
-            
-            # 只处理门外开锁事件（指纹、密码）
-            if method in ["fingerprint", "password"]:
-                self._is_unlocked = True
-                self._last_unlock_time = datetime.now()
-                
-                method_display = method
-                if method == "fingerprint":
-                    method_display = "指纹开锁"
-                elif method == "password":
-                    method_display = "密码开锁"
-                
-                _LOGGER.info(
-                    "门外开门状态更新: %s - 开锁 (方法: %s)",
-                    self._name,
-                    method_display
-                )
-                self.async_write_ha_state()
-                
-                # 取消之前的定时器
-                if self._cancel_timer:
-                    self._cancel_timer.cancel()
-                
-                # 5秒后自动恢复为关闭状态
-                self._cancel_timer = self.hass.loop.call_later(
-                    5, 
-                    self._auto_reset
-                )
+    def _handle_door_unlock_event(self, event_data: dict):
+        """处理本设备的门外开锁事件"""
+        method = event_data.get("method", "unknown")
+
+        # 只处理门外开锁事件（指纹、密码）
+        if method in ["fingerprint", "password"]:
+            self._is_unlocked = True
+            self._last_unlock_time = datetime.now()
+
+            method_display = method
+            if method == "fingerprint":
+                method_display = "指纹开锁"
+            elif method == "password":
+                method_display = "密码开锁"
+
+            _LOGGER.info(
+                "门外开门状态更新: %s - 开锁 (方法: %s)",
+                self._name,
+                method_display
+            )
+            self.async_write_ha_state()
+
+            # 取消之前的定时器
+            if self._cancel_timer:
+                self._cancel_timer.cancel()
+
+            # 5秒后自动恢复为关闭状态
+            self._cancel_timer = self.hass.loop.call_later(
+                5,
+                self._auto_reset
+            )
 
     @callback
     def _auto_reset(self):
@@ -176,42 +181,46 @@ class OutsideDoorUnlockSensor(CoordinatorEntity, BinarySensorEntity):
         self.async_write_ha_state()
         self._cancel_timer = None
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """处理协调器更新"""
-        # 监听开门事件
-        if not hasattr(self, "_event_listener"):
-            self._event_listener = self.hass.bus.async_listen(
-                EVENT_DOOR_UNLOCK, 
-                self._handle_door_unlock_event
-            )
-        self.async_write_ha_state()
-
     async def async_added_to_hass(self):
         """当实体添加到Home Assistant时"""
         await super().async_added_to_hass()
-        # 监听开锁事件
+        # 只监听本设备的开锁事件
         self.async_on_remove(
-            self.hass.bus.async_listen(EVENT_DOOR_UNLOCK, self._handle_door_unlock_event)
+            async_dispatcher_connect(
+                self.hass,
+                signal_push(self.coordinator.entry_id, self._uid, EVENT_DOOR_UNLOCK),
+                self._handle_door_unlock_event,
+            )
         )
 
     async def async_will_remove_from_hass(self):
         """当实体从Home Assistant移除时"""
         # 取消定时器
         if self._cancel_timer:
-            self._cancel_timer()
+            self._cancel_timer.cancel()
+            self._cancel_timer = None
         await super().async_will_remove_from_hass()
 
+    @staticmethod
+    def _build_snapshot(device):
+        """根据设备数据生成属性中的设备字段，设备不存在时为None"""
+        if device is None:
+            return None
+        return (
+            device.get("uid"),
+            device.get("name"),
+            device.get("last_unlock_method", "unknown"),
+        )
+
     @property
     def extra_state_attributes(self):
         """获取额外属性"""
-        attrs = {}
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                attrs["uid"] = device.get("uid")
-                attrs["name"] = device.get("name")
-                if self._last_unlock_time:
-                    attrs["last_unlock_time"] = self._last_unlock_time.isoformat()
-                attrs["last_unlock_method"] = device.get("last_unlock_method", "unknown")
-                break
+        snapshot = self.coordinator.snapshot(self._uid, type(self), self._build_snapshot)
+        if snapshot is None:
+            return {}
+        uid, name, last_unlock_method = snapshot
+        attrs = {"uid": uid, "name": name}
+        if self._last_unlock_time:
+            attrs["last_unlock_time"] = self._last_unlock_time.isoformat()
+        attrs["last_unlock_method"] = last_unlock_method
         return attrs
@@ -0,0 +1,78 @@
+"""叮叮智能门铃 - 启动过程计时
+
+记录配置项设置各阶段（推送中心、设备列表缓存、登录、获取设备列表、实体平台等）的开始时间和用时，
+以及推送token、推送绑定、第一条推送等里程碑距离设置开始的时间。
+同名阶段/里程碑只记录第一次，之后的轮询和重连不影响启动统计。
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class BootstrapTimeline:
+    """启动过程计时"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.started = clock()
+        # 阶段: (开始时间, 用时)，用时为None表示仍在进行
+        self._phases: Dict[str, list] = {}
+        self._milestones: Dict[str, float] = {}
+        self.info: Dict[str, Any] = {}
+
+    def elapsed(self) -> float:
+        """距离设置开始的毫秒数"""
+        return _ms(self._clock() - self.started)
+
+    def start(self, name: str):
+        """阶段开始（已记录过的阶段忽略）"""
+        if name not in self._phases:
+            self._phases[name] = [self._clock(), None]
+
+    def end(self, name: str):
+        """阶段结束"""
+        phase = self._phases.get(name)
+        if phase is not None and phase[1] is None:
+            phase[1] = self._clock() - phase[0]
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """计时一个阶段（只记录第一次）"""
+        if name in self._phases:
+            yield
+            return
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def mark(self, name: str):
+        """记录里程碑（只记录第一次）"""
+        if name not in self._milestones:
+            self._milestones[name] = self._clock() - self.started
+
+    def duration(self, name: str) -> Optional[float]:
+        """阶段用时（毫秒），未结束时为None"""
+        phase = self._phases.get(name)
+        if phase is None or phase[1] is None:
+            return None
+        return _ms(phase[1])
+
+    def as_dict(self) -> dict:
+        """各阶段和里程碑（用于诊断信息）"""
+        return {
+            **self.info,
+            "phases": {
+                name: {
+                    "start_ms": _ms(start - self.started),
+                    "duration_ms": None if duration is None else _ms(duration),
+                }
+                for name, (start, duration) in self._phases.items()
+            },
+            "milestones_ms": {name: _ms(at) for name, at in self._milestones.items()},
+        }
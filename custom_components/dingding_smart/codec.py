@@ -0,0 +1,43 @@
+"""叮叮智能门铃 - JSON编解码
+
+优先使用orjson（Home Assistant自带），不可用时回退到标准库json。
+loads()直接解析bytes/bytearray/memoryview，不需要先解码为str；dumps()返回UTF-8编码的bytes。
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+# 当前使用的JSON实现（用于诊断信息）
+BACKEND = "orjson" if orjson is not None else "json"
+
+# 解析失败时抛出的异常（orjson.JSONDecodeError是json.JSONDecodeError的子类）
+JSONDecodeError = json.JSONDecodeError
+
+JSONInput = Union[bytes, bytearray, memoryview, str]
+
+
+if orjson is not None:
+
+    def loads(data: JSONInput) -> Any:
+        """解析JSON"""
+        return orjson.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为UTF-8编码的JSON"""
+        return orjson.dumps(obj)
+
+else:
+
+    def loads(data: JSONInput) -> Any:
+        """解析JSON（标准库json.loads不支持memoryview，按UTF-8解码后解析）"""
+        if not isinstance(data, str):
+            data = str(data, "utf-8")
+        return json.loads(data)
+
+    def dumps(obj: Any) -> bytes:
+        """序列化为UTF-8编码的JSON"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
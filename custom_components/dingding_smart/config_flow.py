@@ -5,9 +5,24 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from . import DOMAIN, REGION_CN, REGION_EU, REGION_US, CONF_SERVER_REGION
+from . import (
+    DOMAIN,
+    REGION_CN,
+    REGION_EU,
+    REGION_US,
+    CONF_SERVER_REGION,
+    CONF_PUSH_MODE,
+    CONF_PUSH_DEDUP_TTL,
+    CONF_POLL_INTERVAL,
+    DEFAULT_PUSH_DEDUP_TTL,
+    DEFAULT_POLL_INTERVAL,
+    PUSH_MODE_ASYNCIO,
+    PUSH_MODE_THREAD,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,6 +33,15 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
         vol.Required(CONF_SERVER_REGION, default=REGION_CN): vol.In(
             [REGION_CN, REGION_EU, REGION_US]
         ),
+        vol.Optional(CONF_PUSH_MODE, default=PUSH_MODE_ASYNCIO): vol.In(
+            [PUSH_MODE_ASYNCIO, PUSH_MODE_THREAD]
+        ),
+        vol.Optional(CONF_PUSH_DEDUP_TTL, default=DEFAULT_PUSH_DEDUP_TTL): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=3600)
+        ),
+        vol.Optional(CONF_POLL_INTERVAL, default=DEFAULT_POLL_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=86400)
+        ),
     }
 )
 
@@ -27,6 +51,14 @@ class DingDingConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """获取选项流"""
+        return DingDingOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -42,6 +74,7 @@ class DingDingConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     user_input[CONF_USERNAME],
                     user_input[CONF_PASSWORD],
                     user_input[CONF_SERVER_REGION],
+                    async_get_clientsession(self.hass),
                 )
 
                 success = await api.login()
@@ -71,3 +104,30 @@ class DingDingConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=STEP_USER_DATA_SCHEMA,
             errors=errors,
         )
+
+
+class DingDingOptionsFlow(config_entries.OptionsFlow):
+    """叮叮智能选项流"""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """修改轮询间隔"""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        from . import get_poll_interval
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_POLL_INTERVAL, default=get_poll_interval(self._entry)
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                }
+            ),
+        )
@@ -0,0 +1,90 @@
+"""叮叮智能门铃 - 推送去重
+
+重连或服务器重试时同一条推送可能到达两次。去重缓存记录最近推送的指纹，
+在有效期内再次出现的推送直接丢弃，不再分发到Home Assistant。
+没有服务器时间的推送无法区分重发和真实的重复事件（例如连续按两次门铃），
+只在很短的时间内去重。
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_SIZE = 256
+UNTIMED_TTL = 2.0  # 秒，没有服务器时间的推送的去重时间窗口（不超过ttl）
+
+
+class DedupCache:
+    """有效期 + 容量上限的去重缓存
+
+    指纹按首次出现的顺序保存，重复出现不会延长有效期，超出容量时从最早的条目开始淘汰。
+    条目的有效期可以不同，查找时单独检查命中条目是否已过期。
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_size: int = DEFAULT_MAX_SIZE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+
+        # 计数器
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def seen(self, key: Hashable, ttl: Optional[float] = None) -> bool:
+        """判断指纹是否在有效期内出现过，没有出现过时记录下来
+
+        ttl为本条指纹的有效期（不超过缓存的ttl），默认使用缓存的ttl。
+        """
+        if self.ttl <= 0:
+            self.misses += 1
+            return False
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        now = self._clock()
+        entries = self._entries
+
+        # 从最早的条目开始清除过期的条目（遇到未过期的条目即停止）
+        while entries:
+            oldest, expires = next(iter(entries.items()))
+            if expires > now:
+                break
+            del entries[oldest]
+
+        expires = entries.get(key)
+        if expires is not None:
+            if expires > now:
+                self.hits += 1
+                return True
+            del entries[key]
+
+        self.misses += 1
+        entries[key] = now + ttl
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        return {
+            "ttl": self.ttl,
+            "max_size": self.max_size,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
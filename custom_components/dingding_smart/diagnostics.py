@@ -0,0 +1,54 @@
+"""叮叮智能门铃 - 诊断信息"""
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from . import (
+    DOMAIN,
+    CONF_BOUND_API_TOKEN,
+    CONF_BOUND_PUSH_TOKEN,
+    CONF_IMEI,
+    CONF_REFLASH_KEY,
+    CONF_TOKEN,
+)
+from .codec import BACKEND as JSON_BACKEND
+
+TO_REDACT = {
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_TOKEN,
+    CONF_REFLASH_KEY,
+    CONF_IMEI,
+    CONF_BOUND_PUSH_TOKEN,
+    CONF_BOUND_API_TOKEN,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """获取配置项诊断信息"""
+    data = hass.data[DOMAIN][entry.entry_id]
+    push_listener = data["push"]
+    coordinator = data["coordinator"]
+
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "bootstrap": data["bootstrap"].as_dict(),
+        "auth": coordinator.api.auth.as_dict(),
+        "credential_writes": data["credentials"].writes,
+        "device_list": dict(coordinator.api.device_list_stats),
+        "api_requests": {name: dict(stats) for name, stats in coordinator.api.request_stats.items()},
+        "coordinator": dict(coordinator.stats),
+        "polling": coordinator.poll.as_dict(),
+        "push": dict(push_listener.stats),
+        "push_hub": dict(push_listener.hub.stats),
+        "push_reconnect": push_listener.hub.reconnect.as_dict(),
+        "push_heartbeat": push_listener.hub.heartbeat.as_dict(),
+        "push_dedup": push_listener.hub.dedup.as_dict(),
+        "json_backend": JSON_BACKEND,
+        "journal": push_listener.journal.as_dict() if push_listener.journal else None,
+    }
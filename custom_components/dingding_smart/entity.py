@@ -0,0 +1,44 @@
+"""叮叮智能门铃 - 实体基类"""
+from abc import abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import DingDingCoordinator
+
+Snapshot = Tuple[Any, Dict[str, Any]]
+
+
+class DingDingEntity(CoordinatorEntity):
+    """设备实体基类
+
+    状态值和属性由_build_snapshot()根据设备数据生成，协调器按设备缓存，
+    只有该设备的数据变化后才重新生成，读取状态时不再遍历设备列表。
+    监听context为(设备UID, 实体类型)，快照值没有变化时协调器不通知该实体。
+    """
+
+    coordinator: DingDingCoordinator
+
+    def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
+        super().__init__(coordinator, context=(uid, type(self)))
+        self._uid = uid
+        self._name = name
+
+    @staticmethod
+    @abstractmethod
+    def _build_snapshot(device: Optional[dict]) -> Snapshot:
+        """根据设备数据生成(状态值, 属性)，设备不存在时device为None"""
+
+    @property
+    def _snapshot(self) -> Snapshot:
+        return self.coordinator.snapshot(self._uid, type(self), self._build_snapshot)
+
+    @property
+    def native_value(self):
+        """获取传感器值"""
+        return self._snapshot[0]
+
+    @property
+    def extra_state_attributes(self):
+        """获取额外属性"""
+        return self._snapshot[1]
@@ -0,0 +1,176 @@
+"""叮叮智能门铃 - 自适应心跳
+
+定时心跳包作为探测包：记录发送时间，收到服务器的心跳响应时计算往返时间（RTT）。
+确认服务器会回复心跳后，探测包在超时时间内没有响应即判定连接半开。
+心跳间隔在上下限之间自适应：探测成功后逐步加大，连接在等待探测时断开
+（通常是NAT映射超时）则减小间隔，并把失败的间隔记为上限。
+"""
+import socket
+import time
+from typing import Callable, Optional
+
+DEFAULT_INTERVAL = 60.0
+DEFAULT_MIN_INTERVAL = 30.0
+DEFAULT_MAX_INTERVAL = 120.0
+DEFAULT_STEP = 10.0
+SUCCESSES_BEFORE_GROW = 3  # 连续探测成功多少次后加大间隔
+MIN_ACK_TIMEOUT = 5.0
+MAX_ACK_TIMEOUT = 15.0
+ECHO_WINDOW = 10.0  # 超过该时间才到达的心跳视为服务器主动心跳，不计入RTT
+ECHO_CONFIRM_SAMPLES = 2  # 收到多少次响应后确认服务器会回复心跳
+
+# TCP保活参数（秒），内核在应用层心跳之外独立检测死连接
+TCP_KEEPALIVE_IDLE = 20
+TCP_KEEPALIVE_INTERVAL = 5
+TCP_KEEPALIVE_COUNT = 3
+TCP_USER_TIMEOUT_MS = 15000  # 已发送的数据超过该时间未被确认即断开（仅Linux）
+
+
+def tune_socket(sock) -> None:
+    """开启TCP_NODELAY和TCP保活，尽早发现被静默丢弃的连接"""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for name, value in (
+        ("TCP_KEEPIDLE", TCP_KEEPALIVE_IDLE),
+        ("TCP_KEEPINTVL", TCP_KEEPALIVE_INTERVAL),
+        ("TCP_KEEPCNT", TCP_KEEPALIVE_COUNT),
+        ("TCP_USER_TIMEOUT", TCP_USER_TIMEOUT_MS),
+    ):
+        option = getattr(socket, name, None)
+        if option is None:
+            continue
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, option, value)
+        except OSError:
+            pass
+
+
+class HeartbeatController:
+    """自适应心跳控制器"""
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        step: float = DEFAULT_STEP,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.step = step
+        self.interval = min(max(interval, min_interval), max_interval)
+        self.ceiling: Optional[float] = None  # 观察到的NAT超时上限，未失败过时为None
+        self._clock = clock
+
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.echo_confirmed = False
+        self._samples = 0
+        self._successes = 0
+        self._probe_sent: Optional[float] = None
+
+        # 计数器
+        self.probes = 0
+        self.timeouts = 0
+        self.nat_drops = 0
+
+    @property
+    def ack_timeout(self) -> float:
+        """探测包的响应超时时间"""
+        if self.srtt is None:
+            return MAX_ACK_TIMEOUT
+        return min(max(self.srtt + 4 * self.rttvar, MIN_ACK_TIMEOUT), MAX_ACK_TIMEOUT)
+
+    @property
+    def probe_deadline(self) -> Optional[float]:
+        """当前探测包的超时时间点（没有在等待的探测包时为None）"""
+        if self._probe_sent is None:
+            return None
+        return self._probe_sent + self.ack_timeout
+
+    def on_connected(self):
+        """新连接建立，清除上一条连接的探测状态（保留学到的间隔和RTT）"""
+        self._probe_sent = None
+        self._successes = 0
+
+    def on_probe_sent(self):
+        """发送了一个定时心跳包"""
+        now = self._clock()
+        if self._probe_sent is not None and now - self._probe_sent >= self.ack_timeout:
+            # 服务器不回复心跳时，连接在上一个探测窗口内没有断开也视为探测成功
+            self._probe_succeeded()
+        self._probe_sent = now
+        self.probes += 1
+
+    def on_received(self, heartbeat: bool):
+        """收到服务器的消息帧，心跳帧用于计算RTT，其他消息帧只说明连接仍然可用"""
+        if self._probe_sent is None:
+            return
+        if not heartbeat:
+            self._probe_succeeded()
+            return
+
+        rtt = self._clock() - self._probe_sent
+        if rtt > ECHO_WINDOW:
+            return
+
+        # RFC 6298 平滑RTT
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += (abs(self.srtt - rtt) - self.rttvar) / 4
+            self.srtt += (rtt - self.srtt) / 8
+        self._samples += 1
+        if self._samples >= ECHO_CONFIRM_SAMPLES:
+            self.echo_confirmed = True
+        self._probe_succeeded()
+
+    def timed_out(self) -> bool:
+        """探测包超时未响应（仅在确认服务器会回复心跳后判定）"""
+        if not self.echo_confirmed or self._probe_sent is None:
+            return False
+        if self._clock() - self._probe_sent < self.ack_timeout:
+            return False
+        self.timeouts += 1
+        self._probe_failed()
+        return True
+
+    def on_connection_lost(self):
+        """连接断开，等待探测时断开说明当前间隔超过了NAT超时"""
+        if self._probe_sent is not None:
+            self._probe_failed()
+
+    def _probe_succeeded(self):
+        self._probe_sent = None
+        self._successes += 1
+        if self._successes >= SUCCESSES_BEFORE_GROW:
+            self._successes = 0
+            limit = self.max_interval
+            if self.ceiling is not None:
+                # 停在失败间隔以下一档
+                limit = min(limit, self.ceiling - self.step)
+            self.interval = min(self.interval + self.step, limit)
+            self.interval = max(self.interval, self.min_interval)
+
+    def _probe_failed(self):
+        self._probe_sent = None
+        self._successes = 0
+        self.nat_drops += 1
+        self.ceiling = max(self.interval, self.min_interval)
+        self.interval = max(self.interval - 2 * self.step, self.min_interval)
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        return {
+            "interval": self.interval,
+            "ceiling": self.ceiling,
+            "rtt_ms": None if self.srtt is None else round(self.srtt * 1000, 1),
+            "rttvar_ms": None if self.rttvar is None else round(self.rttvar * 1000, 1),
+            "ack_timeout": round(self.ack_timeout, 2),
+            "echo_confirmed": self.echo_confirmed,
+            "probes": self.probes,
+            "timeouts": self.timeouts,
+            "nat_drops": self.nat_drops,
+        }
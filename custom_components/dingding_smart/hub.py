@@ -0,0 +1,787 @@
+"""叮叮智能门铃 - 推送中心
+
+每个服务器区域只建立一条推送连接，由同一区域的所有配置项共享。
+推送中心负责SSL上下文、连接生命周期、注册和消息帧解码，
+并把推送token和解码后的推送分发给订阅的配置项（PushListener）。
+"""
+import asyncio
+import logging
+import random
+import socket
+import ssl
+import threading
+import time
+from typing import Coroutine, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+
+from . import codec
+from .dedup import DEFAULT_TTL as DEFAULT_DEDUP_TTL, UNTIMED_TTL, DedupCache
+from .heartbeat import HeartbeatController, tune_socket
+from .protocol import (
+    CMD_HEARTBEAT,
+    CMD_PUSH,
+    CMD_REGISTER,
+    CMD_TOKEN,
+    HEARTBEAT_FRAME,
+    FrameDecoder,
+    FrameError,
+    PushEvent,
+    WriteScheduler,
+    pack_frame,
+)
+from .reconnect import STATE_HALF_OPEN, ReconnectPolicy
+
+_LOGGER = logging.getLogger(__name__)
+
+# 推送传输模式
+PUSH_MODE_ASYNCIO = "asyncio"  # 直接运行在Home Assistant事件循环中
+PUSH_MODE_THREAD = "thread"  # 独立线程 + 阻塞SSL socket（旧实现）
+
+# 推送连接参数
+PUSH_CONNECT_TIMEOUT = 10
+PUSH_HEARTBEAT_CHECK_INTERVAL = 5  # 线程模式的读取超时，超时后检查心跳
+
+_IDENTITY_CHARS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def generate_push_identity() -> Dict[str, str]:
+    """生成推送客户端身份（注册时使用的随机imei和imsi）"""
+    return {
+        "imei": "".join(random.choices(_IDENTITY_CHARS, k=12)),
+        "imsi": "".join(random.choices(_IDENTITY_CHARS, k=12)),
+    }
+
+
+def create_background_task(hass: HomeAssistant, target: Coroutine, name: str) -> asyncio.Task:
+    """创建不被Home Assistant跟踪的后台任务
+
+    常驻或可能长时间等待服务器的任务如果被hass跟踪，async_block_till_done和启动过程会一直等待它结束。
+    2023.4之前没有async_create_background_task，直接在事件循环中创建任务。
+    """
+    if hasattr(hass, "async_create_background_task"):
+        return hass.async_create_background_task(target, name)
+    return hass.loop.create_task(target)
+
+
+class ResumableSSLContext(ssl.SSLContext):
+    """支持TLS会话复用的SSL上下文
+
+    asyncio的create_connection无法直接传入SSLSession，因此由上下文在创建
+    客户端连接时自动带上最近一次成功连接的会话，重连时可以跳过完整握手。
+    标准库ssl模块无法序列化SSLSession，会话只保存在内存中。
+    """
+
+    session: Optional[ssl.SSLSession] = None
+
+    def wrap_socket(self, sock, server_side=False, *args, session=None, **kwargs):
+        if session is None and not server_side:
+            session = self.session
+        return super().wrap_socket(sock, server_side, *args, session=session, **kwargs)
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, *args, session=None, **kwargs):
+        if session is None and not server_side:
+            session = self.session
+        return super().wrap_bio(incoming, outgoing, server_side, *args, session=session, **kwargs)
+
+
+class PushProtocol(asyncio.BufferedProtocol):
+    """推送协议（asyncio传输，直接运行在Home Assistant事件循环中）"""
+
+    def __init__(self, hub: "PushHub"):
+        self._hub = hub
+        self._decoder = FrameDecoder()
+        self.transport: Optional[asyncio.Transport] = None
+        self.closed: asyncio.Future = hub.hass.loop.create_future()
+        self._session_saved = False
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        """连接建立"""
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """返回接收缓冲区，数据直接写入解码器"""
+        return self._decoder.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        """收到数据，一次解析所有完整的消息帧"""
+        received = time.monotonic()
+        self._decoder.buffer_updated(nbytes)
+
+        # TLS 1.3的会话票据在握手后才到达，收到第一批数据后再保存会话
+        if not self._session_saved:
+            self._session_saved = True
+            self._hub._save_tls_session(self.transport.get_extra_info("ssl_object"))
+
+        try:
+            for cmd, body in self._decoder.frames():
+                _LOGGER.debug("收到命令: %d, 长度: %d", cmd, len(body))
+                # 异常不能逃出buffer_updated，否则asyncio会断开共享的推送连接
+                try:
+                    self._hub._handle_frame(cmd, body, received)
+                except Exception:
+                    _LOGGER.exception("处理消息帧失败: cmd=%d", cmd)
+        except FrameError as e:
+            _LOGGER.error("消息帧解析失败: %s", e)
+            self.transport.abort()
+
+    def connection_lost(self, exc: Optional[Exception]):
+        """连接断开"""
+        self.transport = None
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+
+class PushHub:
+    """推送中心（每个区域一个，基于逆向的Python实现）"""
+
+    FLAG_PUSH_CLIENT_TOKEN = "token"
+
+    # 命令常量
+    CMD_HEARTBEAT = CMD_HEARTBEAT
+    CMD_REGISTER = CMD_REGISTER
+    CMD_TOKEN = CMD_TOKEN
+    CMD_PUSH = CMD_PUSH
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        push_host: str,
+        push_port: int,
+        imei: Optional[str] = None,
+        push_mode: str = PUSH_MODE_ASYNCIO,
+        dedup_ttl: float = DEFAULT_DEDUP_TTL,
+        identity: Optional[Dict[str, str]] = None,
+    ):
+        self.hass = hass
+        self.push_host = push_host
+        self.push_port = push_port
+        self.imei = imei  # 配置的IMEI，优先于身份中的imei
+        # 推送客户端身份，持久化后重启时服务器视为同一客户端
+        self.identity = identity or generate_push_identity()
+        self.push_mode = push_mode
+        self.push_token = None
+        self.listeners: List = []
+
+        self._push_thread: Optional[threading.Thread] = None
+        self._push_task: Optional[asyncio.Task] = None
+        self._protocol: Optional[PushProtocol] = None
+        self._ssl_socket: Optional[ssl.SSLSocket] = None
+        self._decoder = FrameDecoder()
+        self._writer = WriteScheduler()
+        self._last_write = 0.0
+        self._heartbeat_timer: Optional[asyncio.TimerHandle] = None
+        self._socket_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._ssl_context = self._create_ssl_context()
+        self.reconnect = ReconnectPolicy()
+        self.heartbeat = HeartbeatController()
+        # 去重在解码路径中进行（线程模式下在推送线程中），重复的推送不会进入事件循环
+        self.dedup = DedupCache(dedup_ttl)
+
+        # 连接统计
+        self.stats = {
+            "mode": push_mode,
+            "host": push_host,
+            "subscribers": 0,
+            "connections": 0,
+            "handshake_ms_last": None,
+            "session_reused_last": None,
+            "handshakes_resumed": 0,
+            "handshakes_full": 0,
+            "frames": 0,
+            "frames_sent": 0,
+            "writes": 0,
+        }
+
+        # 注册消息帧只生成一次，每次连接直接发送
+        self._register_frame = self._build_register_frame()
+
+    @property
+    def running(self) -> bool:
+        """推送连接是否在运行"""
+        if self._push_thread and self._push_thread.is_alive():
+            return True
+        return bool(self._push_task and not self._push_task.done())
+
+    async def async_subscribe(self, listener):
+        """订阅推送，第一个订阅者启动推送连接"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+        self.stats["subscribers"] = len(self.listeners)
+
+        # 连接已经拿到推送token时直接通知新的订阅者
+        if self.push_token:
+            listener.on_push_token(self.push_token)
+
+        await self.async_start()
+
+    async def async_unsubscribe(self, listener) -> bool:
+        """取消订阅，没有订阅者时停止推送连接，返回推送中心是否已停止"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+        self.stats["subscribers"] = len(self.listeners)
+
+        if self.listeners:
+            return False
+        await self.async_stop()
+        return True
+
+    def _create_ssl_context(self):
+        """创建自定义SSL安全上下文"""
+        # 使用更基础的方式创建SSL上下文（支持会话复用）
+        context = ResumableSSLContext()
+
+        # 禁用证书验证（临时解决方案）
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+        # 启用所有TLS版本
+        try:
+            # 尝试使用TLSVersion常量
+            context.min_version = ssl.TLSVersion.TLSv1
+            context.max_version = ssl.TLSVersion.TLSv1_3
+        except AttributeError:
+            # 兼容旧版本Python
+            context.min_version = ssl.TLSVersion.TLSv1 if hasattr(ssl, 'TLSVersion') else ssl.PROTOCOL_TLSv1
+            context.max_version = ssl.TLSVersion.TLSv1_3 if hasattr(ssl, 'TLSVersion') else ssl.PROTOCOL_TLSv1_2
+
+        # 禁用SSLv3
+        context.options |= ssl.OP_NO_SSLv3
+
+        # 禁用证书验证（再次确认）
+        context.verify_mode = ssl.CERT_NONE
+        context.check_hostname = False
+
+        # 使用更宽松的密码套件
+        try:
+            context.set_ciphers('DEFAULT@SECLEVEL=1')
+        except ssl.SSLError:
+            # 如果设置失败，使用默认密码套件
+            _LOGGER.warning("无法设置自定义密码套件，使用默认值")
+
+        return context
+
+    def _build_register_frame(self) -> bytes:
+        """生成注册消息帧"""
+        register_data = {
+            "imei": self.imei or self.identity["imei"],
+            "imsi": self.identity["imsi"],
+            "type": "Android",
+            "brand": "Xiaomi",
+            "bundle_id": "com.lancens.wxdoorbell",
+        }
+        return pack_frame(CMD_REGISTER, codec.dumps(register_data))
+
+    def set_identity(self, identity: Dict[str, str]):
+        """更换推送客户端身份，断开当前连接后用新身份重新注册"""
+        self.identity = identity
+        self._register_frame = self._build_register_frame()
+        self.push_token = None
+        if self._protocol:
+            _LOGGER.info("推送客户端身份已更换，重新连接: %s", self.push_host)
+            self._disconnect()
+            return
+        with self._socket_lock:
+            if self._ssl_socket:
+                _LOGGER.info("推送客户端身份已更换，重新连接: %s", self.push_host)
+                # 只关闭底层socket，唤醒阻塞读取的推送线程，由线程自己断开并重连
+                try:
+                    socket.socket.shutdown(self._ssl_socket, socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    async def async_start(self):
+        """启动推送连接"""
+        if self.running:
+            return
+
+        self._stop_event.clear()
+        if self.push_mode == PUSH_MODE_THREAD:
+            self._push_thread = threading.Thread(
+                target=self._push_loop, name="DingDingPushThread", daemon=True
+            )
+            self._push_thread.start()
+        else:
+            self._push_task = create_background_task(
+                self.hass, self._async_push_loop(), f"dingding_smart_push_{self.push_host}"
+            )
+        _LOGGER.info("推送中心已启动: %s（模式: %s）", self.push_host, self.push_mode)
+
+    async def async_stop(self):
+        """停止推送连接"""
+        self._stop_event.set()
+        self._disconnect(abort=False)
+
+        if self._push_task:
+            self._push_task.cancel()
+            try:
+                await self._push_task
+            except asyncio.CancelledError:
+                pass
+            self._push_task = None
+
+        if self._push_thread:
+            await self.hass.async_add_executor_job(self._push_thread.join, 5)
+            self._push_thread = None
+
+        _LOGGER.info("推送中心已停止: %s", self.push_host)
+
+    async def _async_push_loop(self):
+        """推送主循环（asyncio模式）"""
+        _LOGGER.info("推送任务已启动")
+
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    # 建立连接
+                    if not await self._async_connect():
+                        self.reconnect.record_failure()
+                    # 发送注册信息
+                    elif not self._send_register():
+                        self._disconnect()
+                        self.reconnect.record_failure()
+                    else:
+                        self.reconnect.record_connected()
+                        self.heartbeat.on_connected()
+
+                        # 主消息循环
+                        await self._async_message_loop()
+                        self._disconnect()
+                        self.heartbeat.on_connection_lost()
+                        self.reconnect.record_disconnect()
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    _LOGGER.error("推送循环异常: %s", e)
+                    self._disconnect()
+                    self.reconnect.record_failure()
+
+                # 停止时任务被取消，等待随之中断
+                await asyncio.sleep(self._next_reconnect_delay())
+        finally:
+            _LOGGER.info("推送任务已停止")
+
+    async def _async_connect(self) -> bool:
+        """连接到推送服务器（asyncio模式）"""
+        try:
+            _LOGGER.info("连接到推送服务器: %s:%d", self.push_host, self.push_port)
+            started = time.monotonic()
+            transport, protocol = await asyncio.wait_for(
+                self.hass.loop.create_connection(
+                    lambda: PushProtocol(self),
+                    self.push_host,
+                    self.push_port,
+                    ssl=self._ssl_context,
+                    server_hostname=self.push_host,
+                ),
+                timeout=PUSH_CONNECT_TIMEOUT,
+            )
+            self._protocol = protocol
+            sock = transport.get_extra_info("socket")
+            if sock is not None:
+                tune_socket(sock)
+            self._record_handshake(started, transport.get_extra_info("ssl_object"))
+            return True
+
+        except asyncio.TimeoutError:
+            _LOGGER.error("连接超时")
+            return False
+        except ssl.SSLError as e:
+            _LOGGER.error("SSL握手失败: %s", e)
+            self._ssl_context.session = None
+            return False
+        except OSError as e:
+            _LOGGER.error("连接失败: %s", e)
+            return False
+
+    async def _async_message_loop(self):
+        """等待连接断开，期间由定时器发送心跳包（asyncio模式）"""
+        protocol = self._protocol
+        self._schedule_heartbeat(self.heartbeat.interval)
+        try:
+            await asyncio.shield(protocol.closed)
+            _LOGGER.warning("服务器关闭连接")
+        finally:
+            if self._heartbeat_timer:
+                self._heartbeat_timer.cancel()
+                self._heartbeat_timer = None
+
+    def _schedule_heartbeat(self, delay: float):
+        """安排下一次心跳检查（asyncio模式）"""
+        self._heartbeat_timer = self.hass.loop.call_later(
+            delay, self._heartbeat_tick
+        )
+
+    def _heartbeat_tick(self):
+        """定时心跳：超过心跳间隔没有发送任何数据时发送心跳包（asyncio模式）"""
+        heartbeat = self.heartbeat
+        if heartbeat.timed_out():
+            _LOGGER.warning(
+                "心跳包%.1f秒内没有响应，连接可能已半开，重新连接", heartbeat.ack_timeout
+            )
+            self._disconnect()
+            return
+
+        now = time.monotonic()
+        idle = now - self._last_write
+        if idle >= heartbeat.interval:
+            _LOGGER.debug("发送心跳包")
+            if not self._send_heartbeat():
+                _LOGGER.warning("发送心跳包失败，连接可能已断开")
+                self._disconnect()
+                return
+            heartbeat.on_probe_sent()
+            idle = 0
+
+        delay = heartbeat.interval - idle
+        deadline = heartbeat.probe_deadline
+        if deadline is not None:
+            delay = min(delay, deadline - now)
+        self._schedule_heartbeat(max(delay, 0.1))
+
+    def _handle_frame(self, cmd: int, data: memoryview, received: float):
+        """处理一个完整的消息帧并回复心跳（asyncio模式）"""
+        self._handle_message(cmd, data, received)
+
+        # 心跳响应加入写入队列，本轮循环结束时合并写出
+        self._queue_heartbeat()
+
+    def _push_loop(self):
+        """推送线程主循环"""
+        _LOGGER.info("推送线程已启动")
+
+        while not self._stop_event.is_set():
+            try:
+                # 建立连接
+                if not self._connect():
+                    self.reconnect.record_failure()
+                # 发送注册信息
+                elif not self._send_register():
+                    self._disconnect()
+                    self.reconnect.record_failure()
+                else:
+                    self.reconnect.record_connected()
+                    self.heartbeat.on_connected()
+
+                    # 主消息循环
+                    self._message_loop()
+                    self._disconnect()
+                    self.heartbeat.on_connection_lost()
+                    self.reconnect.record_disconnect()
+
+            except Exception as e:
+                _LOGGER.error("推送循环异常: %s", e)
+                self._disconnect()
+                self.reconnect.record_failure()
+
+            # 停止时立即中断等待
+            if self._stop_event.wait(self._next_reconnect_delay()):
+                break
+
+        _LOGGER.info("推送线程已停止")
+
+    def _connect(self) -> bool:
+        """连接到推送服务器"""
+        try:
+            _LOGGER.info("连接到推送服务器: %s:%d", self.push_host, self.push_port)
+
+            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client_socket.settimeout(PUSH_CONNECT_TIMEOUT)
+            tune_socket(client_socket)
+
+            # 创建SSL socket（上下文自动带上可复用的TLS会话）
+            self._ssl_socket = self._ssl_context.wrap_socket(
+                client_socket, server_hostname=self.push_host
+            )
+
+            # 建立连接
+            started = time.monotonic()
+            self._ssl_socket.connect((self.push_host, self.push_port))
+            # 读取超时后检查心跳是否到期、探测包是否超时
+            self._ssl_socket.settimeout(PUSH_HEARTBEAT_CHECK_INTERVAL)
+
+            self._record_handshake(started, self._ssl_socket)
+            return True
+
+        except ssl.SSLError as e:
+            _LOGGER.error("SSL握手失败: %s", e)
+            self._ssl_context.session = None
+            return False
+        except socket.error as e:
+            _LOGGER.error("连接失败: %s", e)
+            return False
+        except Exception as e:
+            _LOGGER.error("连接异常: %s", e)
+            return False
+
+    def _next_reconnect_delay(self) -> float:
+        """计算下一次重连前的等待时间"""
+        delay = self.reconnect.next_delay()
+        if self.reconnect.state == STATE_HALF_OPEN:
+            _LOGGER.warning(
+                "推送服务器连续%d次连接失败，%.0f秒后尝试重新连接",
+                self.reconnect.failures,
+                delay,
+            )
+        else:
+            _LOGGER.info("%.1f秒后重新连接推送服务器", delay)
+        return delay
+
+    def _record_handshake(self, started: float, ssl_object):
+        """记录连接握手耗时以及是否复用了TLS会话"""
+        handshake_ms = (time.monotonic() - started) * 1000
+        reused = bool(ssl_object is not None and ssl_object.session_reused)
+        stats = self.stats
+        stats["connections"] += 1
+        stats["handshake_ms_last"] = round(handshake_ms, 1)
+        stats["session_reused_last"] = reused
+        stats["handshakes_resumed" if reused else "handshakes_full"] += 1
+        _LOGGER.info(
+            "已连接到推送服务器（握手%.1fms，%s）",
+            handshake_ms,
+            "复用TLS会话" if reused else "完整握手",
+        )
+
+    def _save_tls_session(self, ssl_object):
+        """保存本次连接的TLS会话，供重连时复用"""
+        if ssl_object is None:
+            return
+        session = ssl_object.session
+        if session is not None:
+            self._ssl_context.session = session
+
+    def _disconnect(self, abort: bool = True):
+        """断开连接
+
+        asyncio模式下默认直接中止传输：TLS的close()要等待对方回复close_notify，
+        连接半开时最长等待ssl_shutdown_timeout（30秒）才触发connection_lost，会推迟重连。
+        只有正常停止时才使用close()。
+        """
+        self._writer.clear()
+        if self._protocol:
+            transport = self._protocol.transport
+            if transport:
+                if abort:
+                    transport.abort()
+                else:
+                    transport.close()
+            self._protocol = None
+
+        with self._socket_lock:
+            if self._ssl_socket:
+                try:
+                    self._ssl_socket.close()
+                except:
+                    pass
+                self._ssl_socket = None
+
+        _LOGGER.info("已断开连接")
+
+    def _send_register(self) -> bool:
+        """发送注册信息"""
+        try:
+            _LOGGER.info("发送注册信息")
+            self._writer.queue(self._register_frame)
+            result = self._flush_writes()
+            if result:
+                _LOGGER.info("注册信息发送成功")
+            else:
+                _LOGGER.error("注册信息发送失败")
+            return result
+        except Exception as e:
+            _LOGGER.error("发送注册信息失败: %s", e)
+            return False
+
+    def _message_loop(self):
+        """主消息处理循环"""
+        decoder = self._decoder
+        decoder.reset()
+        session_saved = False
+        while not self._stop_event.is_set() and self._ssl_socket:
+            try:
+                try:
+                    # 直接读取到解码缓冲区，一次读取可能包含多个消息帧
+                    if not decoder.recv_into(self._ssl_socket):
+                        _LOGGER.warning("服务器关闭连接")
+                        break
+                except socket.timeout:
+                    pass
+                else:
+                    received = time.monotonic()
+
+                    # TLS 1.3的会话票据在握手后才到达，收到第一批数据后再保存会话
+                    if not session_saved:
+                        session_saved = True
+                        self._save_tls_session(self._ssl_socket)
+
+                    for cmd, data in decoder.frames():
+                        _LOGGER.debug("收到命令: %d, 长度: %d", cmd, len(data))
+
+                        # 处理消息
+                        self._handle_message(cmd, data, received)
+
+                        # 心跳响应加入写入队列
+                        self._writer.queue(HEARTBEAT_FRAME)
+
+                # 探测包超时说明连接已半开
+                if self.heartbeat.timed_out():
+                    _LOGGER.warning(
+                        "心跳包%.1f秒内没有响应，连接可能已半开，重新连接",
+                        self.heartbeat.ack_timeout,
+                    )
+                    break
+
+                # 定时心跳
+                if not self._writer and (
+                    time.monotonic() - self._last_write >= self.heartbeat.interval
+                ):
+                    _LOGGER.debug("发送心跳包")
+                    self._writer.queue(HEARTBEAT_FRAME)
+                    self.heartbeat.on_probe_sent()
+
+                # 本轮所有待发送的消息帧合并为一次写入
+                if not self._flush_writes():
+                    _LOGGER.warning("发送心跳包失败，连接可能已断开")
+                    break
+
+            except (ConnectionResetError, BrokenPipeError):
+                _LOGGER.warning("连接丢失")
+                break
+            except FrameError as e:
+                _LOGGER.error("消息帧解析失败: %s", e)
+                break
+            except Exception as e:
+                _LOGGER.error("消息循环异常: %s", e)
+                break
+
+    def _handle_message(
+        self, cmd: int, data: memoryview, received: Optional[float] = None
+    ):
+        """处理接收到的消息"""
+        self.stats["frames"] += 1
+        self.heartbeat.on_received(cmd == self.CMD_HEARTBEAT)
+        try:
+            _LOGGER.debug("收到消息: cmd=%d, data_length=%d", cmd, len(data))
+
+            if cmd == self.CMD_TOKEN:
+                _LOGGER.info("收到CMD_TOKEN命令")
+                token_data = codec.loads(data)
+                _LOGGER.debug("Token数据: %s", token_data)
+                if not isinstance(token_data, dict):
+                    _LOGGER.error("Token数据格式错误: %s", token_data)
+                    return
+                token = token_data.get(self.FLAG_PUSH_CLIENT_TOKEN, "")
+                _LOGGER.info("收到token: %s", token)
+
+                # 收到token后，通知所有订阅者绑定到服务器
+                self._call_in_loop(self._dispatch_token, token)
+
+            elif cmd == self.CMD_PUSH:
+                _LOGGER.info("收到CMD_PUSH命令")
+                push_info = codec.loads(data)
+                _LOGGER.info("收到推送: %s", push_info)
+                if not isinstance(push_info, dict):
+                    _LOGGER.error("推送数据格式错误: %s", push_info)
+                    return
+
+                event = PushEvent.from_dict(push_info)
+                # 没有服务器时间的推送无法区分重发和真实的重复事件，只在很短的时间内去重
+                ttl = None if event.server_time is not None else UNTIMED_TTL
+                if self.dedup.seen(event.fingerprint, ttl):
+                    _LOGGER.info("丢弃重复推送: type=%s, uid=%s", event.type, event.uid)
+                    return
+
+                # 在Home Assistant事件循环中分发推送
+                self._call_in_loop(self._dispatch_push, event, received)
+
+            elif cmd == self.CMD_HEARTBEAT:
+                _LOGGER.debug("收到CMD_HEARTBEAT命令")
+                _LOGGER.debug("收到心跳响应")
+
+            else:
+                _LOGGER.warning("未知命令: %d", cmd)
+
+        except codec.JSONDecodeError:
+            _LOGGER.error("JSON解析失败")
+        except UnicodeDecodeError:
+            _LOGGER.error("数据解码失败")
+
+    def _call_in_loop(self, func, *args):
+        """在Home Assistant事件循环中执行（线程模式下跨线程调度）"""
+        if self.push_mode == PUSH_MODE_THREAD:
+            self.hass.loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def _dispatch_token(self, token: str):
+        """把推送token分发给所有订阅者（在Home Assistant事件循环中）"""
+        self.push_token = token
+        for listener in list(self.listeners):
+            try:
+                listener.on_push_token(token)
+            except Exception:
+                _LOGGER.exception("推送token分发失败")
+
+    def _dispatch_push(self, event: PushEvent, received: Optional[float] = None):
+        """按设备UID把推送路由给订阅者（在Home Assistant事件循环中）"""
+        uid = event.uid
+        targets = [l for l in self.listeners if l.accepts(uid)]
+        if not targets:
+            # 设备不在任何账号的设备列表中（例如刚添加的设备），交给第一个未限定设备的订阅者，
+            # Home Assistant事件是全局的，只需触发一次
+            targets = [l for l in self.listeners if not l.device_uid][:1]
+            _LOGGER.debug("推送设备%s不属于任何已知账号", uid)
+
+        # 一个订阅者处理失败（例如自定义处理器异常）不影响其他订阅者和推送连接
+        for listener in targets:
+            try:
+                listener.on_push(event, received)
+            except Exception:
+                _LOGGER.exception("推送处理失败: type=%s, uid=%s", event.type, uid)
+
+    def _queue_heartbeat(self):
+        """心跳包加入写入队列，同一轮循环中的消息帧合并为一次写入（asyncio模式）"""
+        if self._writer.queue(HEARTBEAT_FRAME):
+            self.hass.loop.call_soon(self._flush_writes)
+
+    def _flush_writes(self) -> bool:
+        """一次写出队列中所有待发送的消息帧"""
+        payload = self._writer.take()
+        if payload is None:
+            return True
+
+        if self._protocol:
+            transport = self._protocol.transport
+            if not transport or transport.is_closing():
+                return False
+            transport.write(payload)
+        else:
+            error = None
+            with self._socket_lock:
+                if not self._ssl_socket:
+                    return False
+                try:
+                    self._ssl_socket.sendall(payload)
+                except OSError as e:
+                    error = e
+            if error:
+                _LOGGER.error("发送失败: %s", error)
+                self._disconnect()
+                return False
+
+        self._last_write = time.monotonic()
+        self.stats["frames_sent"] = self._writer.frames
+        self.stats["writes"] = self._writer.writes
+        _LOGGER.debug("发送数据: %d字节", len(payload))
+        return True
+
+    def _send_message(self, cmd: int, data: bytes) -> bool:
+        """立即发送消息（连同队列中待发送的消息帧）"""
+        self._writer.queue(pack_frame(cmd, data))
+        return self._flush_writes()
+
+    def _send_heartbeat(self) -> bool:
+        """发送心跳包"""
+        return self._send_message(self.CMD_HEARTBEAT, b"")
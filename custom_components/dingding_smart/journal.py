@@ -0,0 +1,312 @@
+"""叮叮智能门铃 - 推送事件日志
+
+固定大小的环形文件，通过mmap追加写入，写满后覆盖最早的记录。
+追加只是内存拷贝（不涉及系统调用），由调用方定期在执行器中调用flush()批量落盘。
+
+文件格式:
+    文件头(64字节): 魔数、版本、容量、写入位置、最早记录位置、记录数、下一个序号
+    记录: 记录头(数据长度、CRC32、序号、时间戳) + JSON数据
+    数据长度为0表示回绕标记，读取时跳到数据区开头
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import codec
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"DDJ1"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sIIIIIQ")  # 魔数、版本、容量、写入位置、最早记录位置、记录数、下一个序号
+DATA_START = 64
+RECORD_HEADER = struct.Struct("<IIQd")  # 数据长度、CRC32、序号、时间戳
+WRAP_MARKER = b"\x00\x00\x00\x00"
+
+DEFAULT_CAPACITY = 1024 * 1024
+
+RawRecord = Tuple[int, float, bytes]  # 序号、时间戳、JSON数据
+
+
+def _record_at(buffer, offset: int) -> Tuple[int, int]:
+    """读取offset处的记录头，遇到回绕标记时跳到数据区开头，返回(记录位置, 数据长度)"""
+    if offset + RECORD_HEADER.size > len(buffer) or buffer[offset : offset + 4] == WRAP_MARKER:
+        offset = DATA_START
+    length = RECORD_HEADER.unpack_from(buffer, offset)[0]
+    return offset, length
+
+
+def _iter_records(buffer, offset: int, count: int) -> Iterator[RawRecord]:
+    """从最早记录的位置开始按顺序读取count条记录"""
+    for _ in range(count):
+        offset, length = _record_at(buffer, offset)
+        _, _, seq, timestamp = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        yield seq, timestamp, buffer[start : start + length]
+        offset = start + length
+
+
+class JournalSnapshot(NamedTuple):
+    """日志文件内容的副本（用于在执行器中查询）"""
+
+    data: bytes
+    tail: int
+    count: int
+
+    def raw_records(self) -> Iterator[RawRecord]:
+        """按时间顺序返回所有记录的原始数据"""
+        return _iter_records(self.data, self.tail, self.count)
+
+
+def query_records(
+    raw_records: Iterable[RawRecord],
+    uid: Optional[str] = None,
+    event_type: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """解码并按设备UID/事件类型/时间范围过滤原始记录，返回最近的limit条（按时间顺序）"""
+    result = []
+    for seq, timestamp, payload in raw_records:
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and timestamp > end:
+            continue
+        try:
+            record = codec.loads(payload)
+        except (codec.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if event_type is not None and record.get("event") != event_type:
+            continue
+        data = record.get("data") or {}
+        if uid is not None and data.get("uid") != uid:
+            continue
+        result.append(
+            {"seq": seq, "time": timestamp, "event_type": record.get("event"), "data": data}
+        )
+    if limit is not None:
+        result = result[-limit:] if limit > 0 else []
+    return result
+
+
+class EventJournal:
+    """推送事件日志（环形文件）
+
+    append()在Home Assistant事件循环中调用；open()/flush()/close()涉及文件IO，需在执行器中调用。
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._head = DATA_START  # 下一条记录的写入位置
+        self._tail = DATA_START  # 最早一条记录的位置
+        self._count = 0
+        self._next_seq = 1
+        self.dirty = False
+
+        # 计数器
+        self.appends = 0
+        self.overwritten = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def is_open(self) -> bool:
+        """日志文件是否已打开"""
+        return self._mm is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def open(self):
+        """打开日志文件（不存在、损坏或格式不符时重新创建）"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        size = os.fstat(fd).st_size
+        if size > DATA_START and size != self.capacity:
+            # 保留已有文件的容量（比文件头还小的文件已损坏，按默认容量重新创建）
+            self.capacity = size
+        if size < self.capacity:
+            self._file.truncate(self.capacity)
+        self._mm = mmap.mmap(fd, self.capacity)
+
+        magic, version, capacity, head, tail, count, next_seq = FILE_HEADER.unpack_from(self._mm, 0)
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or capacity != self.capacity
+            or not DATA_START <= head <= capacity
+            or not DATA_START <= tail <= capacity
+        ):
+            self._reset()
+            return
+
+        self._head, self._tail, self._count, self._next_seq = head, tail, count, next_seq
+        self._recover()
+
+    def close(self):
+        """落盘并关闭日志文件"""
+        if self._mm is not None:
+            self.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def flush(self):
+        """把修改的页写回磁盘"""
+        if self._mm is None or not self.dirty:
+            return
+        self.dirty = False
+        self._mm.flush()
+        self.flushes += 1
+
+    def append(self, event_type: str, data: Dict[str, Any], timestamp: Optional[float] = None) -> bool:
+        """追加一条事件记录，写满时覆盖最早的记录"""
+        mm = self._mm
+        if mm is None:
+            return False
+
+        payload = codec.dumps({"event": event_type, "data": data})
+        size = RECORD_HEADER.size + len(payload)
+        if size > self.capacity - DATA_START:
+            self.dropped += 1
+            return False
+
+        head = self._head
+        if head + size > self.capacity:
+            # 剩余空间不足，写入回绕标记后从数据区开头写入
+            self._evict(head, self.capacity)
+            if self.capacity - head >= len(WRAP_MARKER):
+                mm[head : head + len(WRAP_MARKER)] = WRAP_MARKER
+            head = DATA_START
+        self._evict(head, head + size)
+
+        if timestamp is None:
+            timestamp = time.time()
+        seq = self._next_seq
+        RECORD_HEADER.pack_into(mm, head, len(payload), zlib.crc32(payload), seq, timestamp)
+        mm[head + RECORD_HEADER.size : head + size] = payload
+
+        if not self._count:
+            self._tail = head
+        self._head = head + size
+        self._count += 1
+        self._next_seq = seq + 1
+        self._write_header()
+        self.dirty = True
+        self.appends += 1
+        return True
+
+    def records(self) -> Iterator[Tuple[int, float, Dict[str, Any]]]:
+        """按时间顺序返回所有记录 (序号, 时间戳, {"event": 事件类型, "data": 事件数据})"""
+        for seq, timestamp, payload in self._iter_raw():
+            try:
+                yield seq, timestamp, codec.loads(payload)
+            except (codec.JSONDecodeError, UnicodeDecodeError):
+                continue
+
+    def snapshot(self) -> JournalSnapshot:
+        """复制日志内容
+
+        只是一次内存拷贝，可以在事件循环中调用；读取、解码和过滤交给执行器中的query_records()。
+        """
+        if self._mm is None:
+            return JournalSnapshot(b"", DATA_START, 0)
+        return JournalSnapshot(self._mm[:], self._tail, self._count)
+
+    def query(
+        self,
+        uid: Optional[str] = None,
+        event_type: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """按设备UID/事件类型/时间范围查询记录，返回最近的limit条（按时间顺序）"""
+        return query_records(self._iter_raw(), uid, event_type, start, end, limit)
+
+    def last(self, event_type: str, uid: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """最近一条指定类型的记录"""
+        found = self.query(uid=uid, event_type=event_type, limit=1)
+        return found[0] if found else None
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        return {
+            "capacity": self.capacity,
+            "records": self._count,
+            "appends": self.appends,
+            "overwritten": self.overwritten,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+        }
+
+    def _reset(self):
+        """初始化为空日志"""
+        self._head = self._tail = DATA_START
+        self._count = 0
+        self._next_seq = 1
+        self._write_header()
+        self.dirty = True
+
+    def _write_header(self):
+        FILE_HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION, self.capacity,
+            self._head, self._tail, self._count, self._next_seq,
+        )
+
+    def _record_at(self, offset: int) -> Tuple[int, int]:
+        return _record_at(self._mm, offset)
+
+    def _evict(self, start: int, end: int):
+        """淘汰与[start, end)重叠的最早记录"""
+        while self._count:
+            tail, length = self._record_at(self._tail)
+            if not start <= tail < end:
+                self._tail = tail
+                return
+            self._tail = tail + RECORD_HEADER.size + length
+            self._count -= 1
+            self.overwritten += 1
+        self._tail = start
+
+    def _iter_raw(self) -> Iterator[RawRecord]:
+        if self._mm is None:
+            return iter(())
+        return _iter_records(self._mm, self._tail, self._count)
+
+    def _recover(self):
+        """校验记录（进程异常退出时最后一条记录可能不完整），截断到最后一条有效记录"""
+        mm = self._mm
+        offset = self._tail
+        valid = 0
+        end = offset
+        try:
+            for _ in range(self._count):
+                offset, length = self._record_at(offset)
+                _, crc, seq, _ = RECORD_HEADER.unpack_from(mm, offset)
+                start = offset + RECORD_HEADER.size
+                if start + length > self.capacity or zlib.crc32(mm[start : start + length]) != crc:
+                    break
+                valid += 1
+                offset = end = start + length
+                self._next_seq = max(self._next_seq, seq + 1)
+        except struct.error:
+            pass
+
+        if valid != self._count:
+            _LOGGER.warning("推送事件日志有%d条记录损坏，已丢弃", self._count - valid)
+            self._count = valid
+            self._head = end if valid else self._tail
+            self._write_header()
+            self.dirty = True
@@ -0,0 +1,92 @@
+"""叮叮智能门铃 - 设备列表自适应轮询策略
+
+数据有变化时按基础间隔轮询，没有变化时间隔逐次翻倍直到上限；
+收到设备上线/离线推送后在一段时间内缩短轮询间隔。
+"""
+import time
+from typing import Callable
+
+DEFAULT_POLL_INTERVAL = 300  # 秒，基础轮询间隔，0为关闭轮询
+MIN_POLL_INTERVAL = 30
+DEFAULT_MAX_INTERVAL = 1800.0  # 数据没有变化时退避的上限
+DEFAULT_BOOST_INTERVAL = 30.0  # 上线/离线推送后的轮询间隔
+DEFAULT_BOOST_DURATION = 180.0  # 缩短轮询间隔的持续时间
+
+
+class PollPolicy:
+    """设备列表轮询策略"""
+
+    def __init__(
+        self,
+        base_interval: float = DEFAULT_POLL_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        boost_interval: float = DEFAULT_BOOST_INTERVAL,
+        boost_duration: float = DEFAULT_BOOST_DURATION,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_interval = max_interval
+        self.boost_interval = boost_interval
+        self.boost_duration = boost_duration
+        self._clock = clock
+        self._boost_until = 0.0
+        self.set_base(base_interval)
+
+        # 计数器
+        self.polls_issued = 0
+        self.polls_skipped = 0
+        self.polls_unchanged = 0
+        self.boosts = 0
+
+    @property
+    def enabled(self) -> bool:
+        """是否开启轮询"""
+        return self.base_interval > 0
+
+    @property
+    def boosting(self) -> bool:
+        """是否处于缩短轮询间隔的时间段"""
+        return self._clock() < self._boost_until
+
+    def set_base(self, base_interval: float):
+        """设置基础轮询间隔并重置退避"""
+        if base_interval > 0:
+            base_interval = max(base_interval, MIN_POLL_INTERVAL)
+        self.base_interval = base_interval
+        self.interval = base_interval
+
+    def next_interval(self) -> float:
+        """下一次轮询前需要等待的秒数"""
+        if self.boosting:
+            return min(self.interval, self.boost_interval)
+        return self.interval
+
+    def record_poll(self, changed: bool):
+        """完成一次轮询，数据有变化时恢复基础间隔，否则间隔翻倍"""
+        self.polls_issued += 1
+        if changed:
+            self.interval = self.base_interval
+        else:
+            self.polls_unchanged += 1
+            self.interval = min(self.interval * 2, max(self.max_interval, self.base_interval))
+
+    def record_skipped(self):
+        """跳过一次轮询（Home Assistant启动中）"""
+        self.polls_skipped += 1
+
+    def boost(self):
+        """设备上线/离线后缩短一段时间的轮询间隔"""
+        self.boosts += 1
+        self._boost_until = self._clock() + self.boost_duration
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        return {
+            "base_interval": self.base_interval,
+            "interval": self.interval,
+            "next_interval": self.next_interval(),
+            "boosting": self.boosting,
+            "polls_issued": self.polls_issued,
+            "polls_skipped": self.polls_skipped,
+            "polls_unchanged": self.polls_unchanged,
+            "boosts": self.boosts,
+        }
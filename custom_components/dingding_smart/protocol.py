@@ -0,0 +1,235 @@
+"""叮叮智能门铃 - 推送协议帧编解码
+
+消息格式: 8字节消息头（命令、数据长度，均为4字节小端序）+ JSON数据体
+"""
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 消息头（小端序）
+HEADER = struct.Struct("<II")
+HEADER_SIZE = HEADER.size
+
+# 命令常量
+CMD_HEARTBEAT = 0
+CMD_REGISTER = 1
+CMD_TOKEN = 2
+CMD_PUSH = 3
+
+# 缓冲区参数
+DEFAULT_BUFFER_SIZE = 64 * 1024
+MIN_READ_SIZE = 16 * 1024  # 一个TLS记录的最大明文长度
+MAX_FRAME_SIZE = 4 * 1024 * 1024
+
+
+class FrameError(Exception):
+    """消息帧格式错误"""
+
+
+def pack_frame(cmd: int, data: bytes = b"") -> bytes:
+    """构造一个完整的消息帧"""
+    return HEADER.pack(cmd, len(data)) + data
+
+
+# 推送中服务器时间的字段名（按顺序查找）
+PUSH_TIME_KEYS = ("time", "timestamp")
+
+# 心跳/确认帧（无数据体）
+HEARTBEAT_FRAME = pack_frame(CMD_HEARTBEAT)
+
+
+class WriteScheduler:
+    """写入调度器
+
+    收集同一轮循环中待发送的消息帧（每个收到的帧对应一个心跳确认帧），
+    由调用方在本轮结束时通过take()一次取出并写入，帧的数量和顺序保持不变，
+    只是合并为一次写入（一个TLS记录）。
+    """
+
+    def __init__(self):
+        self._pending: List[bytes] = []
+        self.frames = 0  # 已取出的消息帧数
+        self.writes = 0  # 已取出的写入次数
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def queue(self, frame: bytes) -> bool:
+        """加入待发送的消息帧，队列原本为空时返回True（调用方需安排一次写入）"""
+        self._pending.append(frame)
+        return len(self._pending) == 1
+
+    def take(self) -> Optional[bytes]:
+        """取出所有待发送的消息帧，合并为一次写入的数据"""
+        pending = self._pending
+        if not pending:
+            return None
+        self._pending = []
+        self.frames += len(pending)
+        self.writes += 1
+        return pending[0] if len(pending) == 1 else b"".join(pending)
+
+    def clear(self):
+        """丢弃所有待发送的消息帧（断开连接时使用）"""
+        self._pending.clear()
+
+
+class FrameDecoder:
+    """增量消息帧解码器
+
+    使用预分配的bytearray作为接收缓冲区，数据通过recv_into/get_buffer直接写入，
+    frames()一次解析缓冲区中所有完整的消息帧，以memoryview的形式返回数据体，不做拷贝。
+    返回的memoryview只在下一次写入缓冲区（get_buffer/recv_into/feed）之前有效。
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_BUFFER_SIZE,
+        max_frame_size: int = MAX_FRAME_SIZE,
+    ):
+        self._buffer = bytearray(size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # 未解析数据的起点
+        self._end = 0  # 已写入数据的终点
+        self._need = HEADER_SIZE  # 下一个帧需要的字节数
+        self._max_frame_size = max_frame_size
+
+    @property
+    def pending(self) -> int:
+        """缓冲区中尚未解析的字节数"""
+        return self._end - self._start
+
+    def reset(self):
+        """清空缓冲区（重新连接时使用）"""
+        self._start = self._end = 0
+        self._need = HEADER_SIZE
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """返回可直接写入的空闲缓冲区"""
+        pending = self._end - self._start
+        wanted = max(sizehint, MIN_READ_SIZE, self._need - pending)
+        if len(self._buffer) - self._end < wanted:
+            if self._start and len(self._buffer) - pending >= wanted:
+                # 把未解析的数据移动到缓冲区开头
+                self._view[:pending] = self._view[self._start : self._end]
+            else:
+                # 缓冲区不足以容纳当前帧，扩容
+                size = len(self._buffer)
+                while size - pending < wanted:
+                    size *= 2
+                buffer = bytearray(size)
+                buffer[:pending] = self._view[self._start : self._end]
+                self._buffer = buffer
+                self._view = memoryview(buffer)
+            self._start = 0
+            self._end = pending
+        return self._view[self._end :]
+
+    def buffer_updated(self, nbytes: int):
+        """通知解码器已向get_buffer()返回的缓冲区写入nbytes字节"""
+        self._end += nbytes
+
+    def recv_into(self, sock) -> int:
+        """从socket直接读取数据到缓冲区，返回读取的字节数（0表示连接关闭）"""
+        nbytes = sock.recv_into(self.get_buffer())
+        self._end += nbytes
+        return nbytes
+
+    def feed(self, data: bytes):
+        """写入一段数据（用于无法直接写入缓冲区的场景）"""
+        size = len(data)
+        self.get_buffer(size)[:size] = data
+        self._end += size
+
+    def frames(self) -> Iterator[Tuple[int, memoryview]]:
+        """解析缓冲区中所有完整的消息帧，返回(cmd, 数据体memoryview)"""
+        buffer = self._buffer
+        view = self._view
+        while True:
+            start = self._start
+            available = self._end - start
+            if available < HEADER_SIZE:
+                self._need = HEADER_SIZE
+                break
+
+            cmd, length = HEADER.unpack_from(buffer, start)
+            if length > self._max_frame_size:
+                raise FrameError(f"消息帧过长: cmd={cmd}, length={length}")
+
+            total = HEADER_SIZE + length
+            if available < total:
+                self._need = total
+                break
+
+            self._start = start + total
+            yield cmd, view[start + HEADER_SIZE : start + total]
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+
+class PushEvent:
+    """规范化后的推送内容
+
+    message/alert/name为空时从aps字段补全，每条推送只解析一次，
+    由推送中心创建后分发给所有订阅者共享（只读）。
+    """
+
+    __slots__ = ("type", "uid", "message", "alert", "name", "raw")
+
+    def __init__(
+        self,
+        type: Optional[str],
+        uid: Optional[str],
+        message: str = "",
+        alert: str = "",
+        name: str = "",
+        raw: Optional[Dict[str, Any]] = None,
+    ):
+        self.type = type
+        self.uid = uid
+        self.message = message
+        self.alert = alert
+        self.name = name
+        self.raw = raw if raw is not None else {}  # 原始推送数据（自定义处理器可读取其他字段）
+
+    @classmethod
+    def from_dict(cls, push_info: Dict[str, Any]) -> "PushEvent":
+        """从推送JSON创建"""
+        get = push_info.get
+        # 字段可能为null
+        message = get("message") or ""
+        alert = get("alert") or ""
+        name = get("name") or ""
+
+        # 检查aps字段中的消息内容
+        aps = get("aps")
+        if isinstance(aps, dict):
+            if message == "":
+                message = aps.get("message") or ""
+            if alert == "":
+                alert = aps.get("alert") or ""
+            if name == "":
+                name = aps.get("name") or ""
+
+        return cls(get("type"), get("uid"), message, alert, name, push_info)
+
+    @property
+    def server_time(self) -> Optional[str]:
+        """推送中的服务器时间（没有时为None）"""
+        raw = self.raw
+        for key in PUSH_TIME_KEYS:
+            value = raw.get(key)
+            if value is not None:
+                return str(value)
+        return None
+
+    @property
+    def fingerprint(self) -> Tuple[Any, ...]:
+        """去重指纹: (uid, type, message, 服务器时间)"""
+        return (self.uid, self.type, str(self.message).strip(), self.server_time)
+
+    def __repr__(self) -> str:
+        return (
+            f"PushEvent(type={self.type!r}, uid={self.uid!r}, message={self.message!r}, "
+            f"alert={self.alert!r}, name={self.name!r})"
+        )
@@ -0,0 +1,119 @@
+"""叮叮智能门铃 - 推送重连策略
+
+指数退避 + 完全抖动（full jitter）+ 熔断器。
+时钟和随机数可注入，便于确定性测试。
+"""
+import random
+import time
+from typing import Callable
+
+# 熔断器状态
+STATE_CLOSED = "closed"  # 正常重连
+STATE_OPEN = "open"  # 连续失败过多，暂停重连
+STATE_HALF_OPEN = "half_open"  # 熔断时间结束，允许一次试探连接
+
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 120.0
+DEFAULT_FAILURE_THRESHOLD = 10
+DEFAULT_OPEN_DURATION = 300.0
+DEFAULT_STABLE_AFTER = 60.0  # 连接保持超过该时间视为稳定，重置退避
+
+
+class ReconnectPolicy:
+    """推送重连策略"""
+
+    def __init__(
+        self,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        open_duration: float = DEFAULT_OPEN_DURATION,
+        stable_after: float = DEFAULT_STABLE_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.open_duration = open_duration
+        self.stable_after = stable_after
+        self._clock = clock
+        self._rng = rng
+
+        self.state = STATE_CLOSED
+        self.failures = 0  # 连续失败次数
+        self._open_until = 0.0
+        self._connected_at = None
+
+        # 计数器
+        self.attempts = 0
+        self.total_failures = 0
+        self.total_connects = 0
+        self.circuit_opens = 0
+        self.last_delay = 0.0
+
+    def next_delay(self) -> float:
+        """下一次重连前需要等待的秒数"""
+        now = self._clock()
+        if self.state == STATE_OPEN:
+            if now < self._open_until:
+                delay = self._open_until - now
+            else:
+                delay = 0.0
+            # 熔断时间结束后只允许一次试探连接
+            self.state = STATE_HALF_OPEN
+        else:
+            # 完全抖动: [0, min(max, base * 2^failures)) 之间均匀分布
+            cap = min(self.max_delay, self.base_delay * (2 ** min(self.failures, 32)))
+            delay = self._rng() * cap
+
+        self.attempts += 1
+        self.last_delay = delay
+        return delay
+
+    def record_failure(self):
+        """连接或注册失败"""
+        self._connected_at = None
+        self.failures += 1
+        self.total_failures += 1
+        if self.state == STATE_HALF_OPEN or self.failures >= self.failure_threshold:
+            self._open_circuit()
+
+    def record_connected(self):
+        """连接并注册成功"""
+        self._connected_at = self._clock()
+        self.total_connects += 1
+        self.state = STATE_CLOSED
+
+    def record_disconnect(self):
+        """已建立的连接断开，连接保持时间过短时视为一次失败"""
+        connected_at = self._connected_at
+        self._connected_at = None
+        if connected_at is not None and self._clock() - connected_at >= self.stable_after:
+            self.reset()
+        else:
+            self.record_failure()
+
+    def reset(self):
+        """连接稳定后重置退避"""
+        self.failures = 0
+        self.state = STATE_CLOSED
+
+    def _open_circuit(self):
+        """打开熔断器，暂停重连一段时间"""
+        if self.state != STATE_OPEN:
+            self.circuit_opens += 1
+        self.state = STATE_OPEN
+        self._open_until = self._clock() + self.open_duration
+
+    def as_dict(self) -> dict:
+        """状态和计数器（用于诊断信息）"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "attempts": self.attempts,
+            "total_failures": self.total_failures,
+            "total_connects": self.total_connects,
+            "circuit_opens": self.circuit_opens,
+            "last_delay": round(self.last_delay, 2),
+        }
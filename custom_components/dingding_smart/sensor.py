@@ -8,11 +8,22 @@ from homeassistant.const import (
     PERCENTAGE,
     SIGNAL_STRENGTH_DECIBELS_MILLIWATT,
 )
-from homeassistant.core import HomeAssistant, Event
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import DOMAIN, DingDingCoordinator, EVENT_DOOR_UNLOCK
+from . import (
+    ATTR_LAST_SEEN,
+    ATTR_LOW_BATTERY,
+    ATTR_ONLINE,
+    DOMAIN,
+    DingDingCoordinator,
+    EVENT_DOOR_UNLOCK,
+    LAST_UNLOCK_CONTEXT,
+    signal_push,
+)
+from .entity import DingDingEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -52,20 +63,22 @@ async def async_setup_entry(
 
     async_add_entities(entities)
 
-    # 监听开门事件
-    def handle_unlock_event(event: Event):
-        """处理开门事件"""
-        event_data = event.data
-        coordinator.update_unlock_event(event_data)
-
-    hass.bus.async_listen(EVENT_DOOR_UNLOCK, handle_unlock_event)
+    # 监听本配置项设备的开门事件
+    for device in devices:
+        entry.async_on_unload(
+            async_dispatcher_connect(
+                hass,
+                signal_push(entry.entry_id, device.get("uid", ""), EVENT_DOOR_UNLOCK),
+                coordinator.update_unlock_event,
+            )
+        )
 
 
 class LastUnlockSensor(CoordinatorEntity, SensorEntity):
     """最新开门事件传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=(uid, LAST_UNLOCK_CONTEXT))
         self._uid = uid
         self._name = name
         self._attr_unique_id = f"{DOMAIN}_{uid}_last_unlock"
@@ -96,191 +109,127 @@ class LastUnlockSensor(CoordinatorEntity, SensorEntity):
         return {}
 
 
-class DeviceStatusSensor(CoordinatorEntity, SensorEntity):
+class DeviceStatusSensor(DingDingEntity, SensorEntity):
     """设备状态传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_status"
         self._attr_name = f"{name} 状态"
         self._attr_icon = "mdi:check-circle"
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return "在线"
-        return "离线"
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "uid": device.get("uid"),
-                    "name": device.get("name"),
-                    "product": device.get("product"),
-                    "wifi": device.get("wifi"),
-                    "timezone": device.get("time_zone"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return "离线", {}
+        return "在线" if device.get(ATTR_ONLINE, True) else "离线", {
+            "uid": device.get("uid"),
+            "name": device.get("name"),
+            "product": device.get("product"),
+            "wifi": device.get("wifi"),
+            "timezone": device.get("time_zone"),
+        }
 
 
-class DeviceOnlineSensor(CoordinatorEntity, SensorEntity):
+class DeviceOnlineSensor(DingDingEntity, SensorEntity):
     """设备在线状态传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_online"
         self._attr_name = f"{name} 在线"
         self._attr_icon = "mdi:lan-connect"
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return True
-        return False
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "uid": device.get("uid"),
-                    "name": device.get("name"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return False, {}
+        return device.get(ATTR_ONLINE, True), {
+            "uid": device.get("uid"),
+            "name": device.get("name"),
+            "last_seen": device.get(ATTR_LAST_SEEN),
+        }
 
 
-class DeviceBatterySensor(CoordinatorEntity, SensorEntity):
+class DeviceBatterySensor(DingDingEntity, SensorEntity):
     """设备电池电量传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_battery"
         self._attr_name = f"{name} 电池电量"
         self._attr_icon = "mdi:battery"
         self._attr_native_unit_of_measurement = PERCENTAGE
         self._attr_device_class = SensorDeviceClass.BATTERY
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                battery = device.get("battery", 0)
-                return battery
-        return None
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "battery2": device.get("battery2"),
-                    "battery_display_enabled": device.get("bat_display_en", 0),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return None, {}
+        return device.get("battery", 0), {
+            "battery2": device.get("battery2"),
+            "battery_display_enabled": device.get("bat_display_en", 0),
+            "low_battery": device.get(ATTR_LOW_BATTERY, False),
+        }
 
 
-class DeviceWifiSignalSensor(CoordinatorEntity, SensorEntity):
+class DeviceWifiSignalSensor(DingDingEntity, SensorEntity):
     """设备WiFi信号传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_wifi_signal"
         self._attr_name = f"{name} WiFi信号"
         self._attr_icon = "mdi:wifi"
         self._attr_native_unit_of_measurement = SIGNAL_STRENGTH_DECIBELS_MILLIWATT
         self._attr_device_class = SensorDeviceClass.SIGNAL_STRENGTH
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                rssi = device.get("rssi", 0)
-                return rssi
-        return None
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                rssi = device.get("rssi", 0)
-                signal_quality = "优秀"
-                if rssi > -50:
-                    signal_quality = "优秀"
-                elif rssi > -60:
-                    signal_quality = "良好"
-                elif rssi > -70:
-                    signal_quality = "一般"
-                else:
-                    signal_quality = "较差"
-                
-                return {
-                    "rssi": rssi,
-                    "signal_quality": signal_quality,
-                    "wifi_level": device.get("wifi"),
-                }
-        return {}
-
-
-class DeviceVersionSensor(CoordinatorEntity, SensorEntity):
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return None, {}
+        rssi = device.get("rssi", 0)
+        if rssi > -50:
+            signal_quality = "优秀"
+        elif rssi > -60:
+            signal_quality = "良好"
+        elif rssi > -70:
+            signal_quality = "一般"
+        else:
+            signal_quality = "较差"
+
+        return rssi, {
+            "rssi": rssi,
+            "signal_quality": signal_quality,
+            "wifi_level": device.get("wifi"),
+        }
+
+
+class DeviceVersionSensor(DingDingEntity, SensorEntity):
     """设备版本传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_version"
         self._attr_name = f"{name} 版本"
         self._attr_icon = "mdi:information"
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                version = device.get("current_version", "未知")
-                return version
-        return "未知"
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "current_version": device.get("current_version"),
-                    "latest_version": device.get("latest_version"),
-                    "update_available": device.get("current_version") != device.get("latest_version"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return "未知", {}
+        return device.get("current_version", "未知"), {
+            "current_version": device.get("current_version"),
+            "latest_version": device.get("latest_version"),
+            "update_available": device.get("current_version") != device.get("latest_version"),
+        }
 
 
-class DeviceUidSensor(CoordinatorEntity, SensorEntity):
+class DeviceUidSensor(DingDingEntity, SensorEntity):
     """设备UID传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_uid"
         self._attr_name = f"{name} UID"
         self._attr_icon = "mdi:identifier"
@@ -290,86 +239,62 @@ class DeviceUidSensor(CoordinatorEntity, SensorEntity):
         """获取传感器值"""
         return self._uid
 
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "uid": device.get("uid"),
-                    "device_id": device.get("id"),
-                    "name": device.get("name"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return None, {}
+        return None, {
+            "uid": device.get("uid"),
+            "device_id": device.get("id"),
+            "name": device.get("name"),
+        }
+
 
+# 在线类型
+ONLINE_TYPE_MAP = {
+    0: "未知",
+    1: "WiFi",
+    2: "有线",
+    3: "4G",
+    20: "WiFi",
+}
 
-class DeviceOnlineTypeSensor(CoordinatorEntity, SensorEntity):
+
+class DeviceOnlineTypeSensor(DingDingEntity, SensorEntity):
     """设备在线类型传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_online_type"
         self._attr_name = f"{name} 在线类型"
         self._attr_icon = "mdi:network"
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                online_type = device.get("online_type", 0)
-                type_map = {
-                    0: "未知",
-                    1: "WiFi",
-                    2: "有线",
-                    3: "4G",
-                    20: "WiFi",
-                }
-                return type_map.get(online_type, f"类型{online_type}")
-        return "未知"
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "online_type": device.get("online_type"),
-                    "device_type": device.get("device"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return "未知", {}
+        online_type = device.get("online_type", 0)
+        return ONLINE_TYPE_MAP.get(online_type, f"类型{online_type}"), {
+            "online_type": device.get("online_type"),
+            "device_type": device.get("device"),
+        }
 
 
-class DeviceUpdateTimeSensor(CoordinatorEntity, SensorEntity):
+class DeviceUpdateTimeSensor(DingDingEntity, SensorEntity):
     """设备更新时间传感器"""
 
     def __init__(self, coordinator: DingDingCoordinator, uid: str, name: str):
-        super().__init__(coordinator)
-        self._uid = uid
-        self._name = name
+        super().__init__(coordinator, uid, name)
         self._attr_unique_id = f"{DOMAIN}_{uid}_update_time"
         self._attr_name = f"{name} 最后更新"
         self._attr_icon = "mdi:clock"
 
-    @property
-    def native_value(self):
-        """获取传感器值"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                update_time = device.get("dev_update_time", "")
-                return update_time
-        return "未知"
-
-    @property
-    def extra_state_attributes(self):
-        """获取额外属性"""
-        for device in self.coordinator.devices:
-            if device.get("uid") == self._uid:
-                return {
-                    "update_time": device.get("dev_update_time"),
-                    "time": device.get("time"),
-                    "timezone": device.get("time_zone"),
-                }
-        return {}
+    @staticmethod
+    def _build_snapshot(device):
+        if device is None:
+            return "未知", {}
+        return device.get("dev_update_time", ""), {
+            "update_time": device.get("dev_update_time"),
+            "time": device.get("time"),
+            "timezone": device.get("time_zone"),
+        }
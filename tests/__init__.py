@@ -0,0 +1 @@
+"""叮叮智能门铃集成的测试"""
@@ -0,0 +1,139 @@
+"""测试用的替身服务器和辅助函数"""
+import asyncio
+import datetime
+import json
+import ssl
+from pathlib import Path
+from typing import List, Tuple
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from custom_components.dingding_smart.protocol import (
+    CMD_PUSH,
+    CMD_REGISTER,
+    CMD_TOKEN,
+    HEADER,
+    pack_frame,
+)
+
+PUSH_TOKEN = "tok12"
+
+
+def create_server_ssl_context(directory: Path) -> ssl.SSLContext:
+    """生成127.0.0.1的自签名证书，返回服务端SSL上下文"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / "cert.pem"
+    key_path = directory / "key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class PushServer:
+    """替身推送服务器：记录收到的消息帧，注册后回复推送token"""
+
+    def __init__(self, ssl_context: ssl.SSLContext):
+        self._ssl_context = ssl_context
+        self._server = None
+        self.port = 0
+        self.clients: List[asyncio.StreamWriter] = []
+        self.frames: List[Tuple[int, bytes]] = []
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_client, "127.0.0.1", 0, ssl=self._ssl_context
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for writer in self.clients:
+            writer.transport.abort()
+        self._server.close()
+
+    async def _handle_client(self, reader, writer):
+        self.clients.append(writer)
+        try:
+            while True:
+                cmd, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+                body = await reader.readexactly(length) if length else b""
+                self.frames.append((cmd, body))
+                if cmd == CMD_REGISTER:
+                    token = json.dumps({"token": PUSH_TOKEN}).encode()
+                    writer.write(pack_frame(CMD_TOKEN, token))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def count(self, cmd: int) -> int:
+        """收到的某种命令的消息帧数"""
+        return sum(1 for frame_cmd, _ in self.frames if frame_cmd == cmd)
+
+    def push(self, infos: List[dict]):
+        """把多条推送一次写给所有客户端"""
+        data = b"".join(pack_frame(CMD_PUSH, json.dumps(info).encode()) for info in infos)
+        for writer in self.clients:
+            writer.write(data)
+
+
+class PushRecorder:
+    """记录推送中心分发的推送token和推送"""
+
+    device_uid = None
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.events: list = []
+
+    def accepts(self, uid) -> bool:
+        return True
+
+    def on_push_token(self, token: str):
+        self.tokens.append(token)
+
+    def on_push(self, event, received=None):
+        self.events.append(event)
+
+
+async def wait_for(predicate, timeout: float = 5.0):
+    """等待条件成立"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() > deadline:
+            raise AssertionError("等待超时")
+        await asyncio.sleep(0.01)
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
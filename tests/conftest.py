@@ -0,0 +1,27 @@
+"""测试配置
+
+协程测试函数在新的事件循环中运行，不依赖pytest-asyncio。
+"""
+import asyncio
+import inspect
+
+import pytest
+
+from .common import create_server_ssl_context
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """在新的事件循环中运行协程测试函数"""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    funcargs = pyfuncitem.funcargs
+    kwargs = {name: funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**kwargs))
+    return True
+
+
+@pytest.fixture(scope="session")
+def server_ssl_context(tmp_path_factory):
+    """替身服务器使用的自签名证书"""
+    return create_server_ssl_context(tmp_path_factory.mktemp("tls"))
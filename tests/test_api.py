@@ -0,0 +1,111 @@
+"""API客户端连接复用的测试"""
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import custom_components.dingding_smart as dingding
+
+FETCHES = 20
+
+
+class ApiServer:
+    """替身API服务器：记录每个请求所在的连接"""
+
+    def __init__(self, ssl_context):
+        self._ssl_context = ssl_context
+        self._runner = None
+        self.port = 0
+        self.requests = 0
+        self.connections = set()
+        self.close_headers = 0
+
+    async def start(self):
+        app = web.Application(middlewares=[self._record])
+        app.router.add_post("/v1/api/user/login", self._login)
+        app.router.add_get("/v1/api/user/device", self._devices)
+        app.router.add_post("/v1/api/user/token", self._bind)
+        app.router.add_post("/v1/api/user/message/token", self._bind)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0, ssl_context=self._ssl_context)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _record(self, request, handler):
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        if request.headers.get("Connection", "").lower() == "close":
+            self.close_headers += 1
+        return await handler(request)
+
+    async def _login(self, request):
+        return web.json_response({"token": "T" * 32, "id": 1, "time": int(time.time())})
+
+    async def _devices(self, request):
+        return web.json_response([{"uid": "U1", "name": "门铃"}])
+
+    async def _bind(self, request):
+        return web.json_response({"message": "success"})
+
+
+@pytest.fixture
+def api_server(server_ssl_context, monkeypatch):
+    server = ApiServer(server_ssl_context)
+    # 端口在服务器启动后才知道，api_host在测试中设置
+    monkeypatch.setitem(dingding.SERVERS, dingding.REGION_CN, dict(dingding.SERVERS[dingding.REGION_CN]))
+    return server
+
+
+async def _exercise(api):
+    assert await api.login()
+    for _ in range(FETCHES):
+        assert await api.get_device_list(raise_errors=True)
+    assert await api.bind_push_token("push-token")
+
+
+async def test_shared_session_reuses_connections(api_server):
+    await api_server.start()
+    dingding.SERVERS[dingding.REGION_CN]["api_host"] = f"https://127.0.0.1:{api_server.port}/"
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=False))
+    try:
+        api = dingding.DingDingAPI("user", "password", session=session, device_list_freshness=0)
+        await _exercise(api)
+        await api.close()
+
+        assert api_server.requests == FETCHES + 3
+        assert api_server.close_headers == 0
+        # 两个绑定请求并发发送，最多多开一个连接
+        assert len(api_server.connections) <= 2
+        # 共享会话由Home Assistant关闭
+        assert not session.closed
+    finally:
+        await session.close()
+        await api_server.stop()
+
+
+async def test_own_session_is_pooled_and_closed(api_server, monkeypatch):
+    await api_server.start()
+    dingding.SERVERS[dingding.REGION_CN]["api_host"] = f"https://127.0.0.1:{api_server.port}/"
+    # 自行创建的会话使用默认证书校验，替身服务器使用自签名证书
+    monkeypatch.setattr(
+        dingding.aiohttp,
+        "TCPConnector",
+        lambda **kwargs: aiohttp.connector.TCPConnector(ssl=False, **kwargs),
+    )
+    try:
+        api = dingding.DingDingAPI("user", "password", device_list_freshness=0)
+        await _exercise(api)
+        session = api._session
+        await api.close()
+
+        assert api_server.requests == FETCHES + 3
+        assert len(api_server.connections) <= 2
+        assert session.closed
+    finally:
+        await api_server.stop()
@@ -0,0 +1,99 @@
+"""API token续期的测试"""
+import asyncio
+
+from custom_components.dingding_smart.auth import TokenManager, parse_token_expiry
+
+from .common import FakeClock
+
+NOW = 1_700_000_000.0
+DAY = 24 * 3600.0
+
+
+def test_parse_token_expiry():
+    lifetime = 7 * DAY
+    # 签发时间（秒/毫秒）
+    assert parse_token_expiry(NOW - 60, NOW, lifetime) == NOW - 60 + lifetime
+    assert parse_token_expiry(int((NOW - 60) * 1000), NOW, lifetime) == NOW - 60 + lifetime
+    # 过期时间
+    assert parse_token_expiry(str(NOW + DAY), NOW, lifetime) == NOW + DAY
+    # 无法解析时按刚签发处理
+    assert parse_token_expiry(None, NOW, lifetime) == NOW + lifetime
+    assert parse_token_expiry("abc", NOW, lifetime) == NOW + lifetime
+    # 不像时间戳的数值：过期时间未知
+    assert parse_token_expiry(3600, NOW, lifetime) is None
+    assert parse_token_expiry(0, NOW, lifetime) is None
+
+
+class _Backend:
+    """记录登录/刷新次数的替身"""
+
+    def __init__(self, refresh_result=True):
+        self.refresh_result = refresh_result
+        self.logins = 0
+        self.refreshes = 0
+        self.release = asyncio.Event()
+
+    async def login(self) -> bool:
+        self.logins += 1
+        await self.release.wait()
+        return True
+
+    async def refresh(self):
+        self.refreshes += 1
+        await self.release.wait()
+        return self.refresh_result
+
+
+async def test_renews_before_expiry():
+    clock = FakeClock(NOW)
+    backend = _Backend()
+    backend.release.set()
+    manager = TokenManager(
+        backend.login, backend.refresh, lifetime=DAY, refresh_margin=3600, clock=clock
+    )
+    manager.set_issued(NOW)
+
+    assert await manager.ensure_valid("token")
+    assert backend.refreshes == 0
+
+    clock.advance(DAY - 3600)
+    assert manager.expiring()
+    assert await manager.ensure_valid("token")
+    assert (backend.refreshes, backend.logins) == (1, 0)
+    assert manager.refresh_supported is True
+
+
+async def test_unknown_expiry_never_renews_early():
+    clock = FakeClock(NOW)
+    backend = _Backend()
+    manager = TokenManager(backend.login, backend.refresh, clock=clock)
+    manager.set_issued(3600)
+    clock.advance(365 * DAY)
+    assert not manager.expiring()
+    assert manager.as_dict()["expires_in"] is None
+
+
+async def test_concurrent_renewals_share_one_login():
+    backend = _Backend()
+    manager = TokenManager(backend.login, backend.refresh, clock=FakeClock(NOW))
+
+    waiters = [asyncio.ensure_future(manager.ensure_valid(None)) for _ in range(5)]
+    await asyncio.sleep(0)
+    backend.release.set()
+    assert await asyncio.gather(*waiters) == [True] * 5
+    assert backend.logins == 1
+    assert manager.coalesced == 4
+
+
+async def test_unsupported_refresh_falls_back_to_login():
+    backend = _Backend(refresh_result=None)
+    backend.release.set()
+    manager = TokenManager(backend.login, backend.refresh, clock=FakeClock(NOW))
+
+    assert await manager.renew(prefer_refresh=True)
+    assert (backend.refreshes, backend.logins) == (1, 1)
+    assert manager.refresh_supported is False
+
+    # 之后直接重新登录
+    assert await manager.renew(prefer_refresh=True)
+    assert (backend.refreshes, backend.logins) == (1, 2)
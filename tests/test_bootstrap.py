@@ -0,0 +1,49 @@
+"""启动过程计时的测试"""
+from custom_components.dingding_smart.bootstrap import BootstrapTimeline
+
+from .common import FakeClock
+
+
+def test_phases_and_milestones():
+    clock = FakeClock(100.0)
+    timeline = BootstrapTimeline(clock)
+
+    clock.advance(0.01)
+    with timeline.phase("push_hub"):
+        clock.advance(0.25)
+    timeline.start("first_refresh")
+    assert timeline.duration("first_refresh") is None
+    clock.advance(0.5)
+    timeline.mark("push_token")
+    timeline.end("first_refresh")
+    timeline.info["cache"] = "hit"
+
+    assert timeline.duration("push_hub") == 250.0
+    assert timeline.duration("first_refresh") == 500.0
+    assert timeline.elapsed() == 760.0
+    assert timeline.as_dict() == {
+        "cache": "hit",
+        "phases": {
+            "push_hub": {"start_ms": 10.0, "duration_ms": 250.0},
+            "first_refresh": {"start_ms": 260.0, "duration_ms": 500.0},
+        },
+        "milestones_ms": {"push_token": 760.0},
+    }
+
+
+def test_only_first_occurrence_is_recorded():
+    clock = FakeClock()
+    timeline = BootstrapTimeline(clock)
+    with timeline.phase("login"):
+        clock.advance(1)
+    timeline.mark("push_bound")
+
+    # 之后的重连和轮询不影响启动统计
+    clock.advance(10)
+    with timeline.phase("login"):
+        clock.advance(5)
+    timeline.end("login")
+    timeline.mark("push_bound")
+
+    assert timeline.duration("login") == 1000.0
+    assert timeline.as_dict()["milestones_ms"] == {"push_bound": 1000.0}
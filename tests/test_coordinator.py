@@ -0,0 +1,80 @@
+"""协调器合并推送修改的测试"""
+from homeassistant.core import CoreState, HomeAssistant
+
+from custom_components.dingding_smart import ATTR_ONLINE, DingDingCoordinator
+
+
+class _Api:
+    """返回可修改设备列表的替身"""
+
+    token = "token"
+
+    def __init__(self, devices):
+        self.devices = devices
+
+    async def ensure_token(self) -> bool:
+        return True
+
+    async def get_device_list(self, raise_errors: bool = False) -> list:
+        return [dict(device) for device in self.devices]
+
+
+class _Listener:
+    entry_id = "entry"
+    uids: set = set()
+
+
+async def _coordinator(tmp_path, devices):
+    hass = HomeAssistant(str(tmp_path))
+    hass.state = CoreState.running
+    api = _Api(devices)
+    coordinator = DingDingCoordinator(hass, api, _Listener())
+    await coordinator.async_refresh()
+    return hass, api, coordinator
+
+
+def _online(coordinator, uid):
+    return coordinator.get_device(uid).get(ATTR_ONLINE, True)
+
+
+async def test_offline_push_survives_refresh_with_older_report(tmp_path):
+    """推送触发的刷新拿到设备掉线前上报的新dev_update_time，离线状态保留"""
+    hass, api, coordinator = await _coordinator(
+        tmp_path, [{"uid": "A", "dev_update_time": "10:00"}]
+    )
+    try:
+        coordinator.async_apply_patch("A", {ATTR_ONLINE: False})
+        assert not _online(coordinator, "A")
+
+        api.devices[0]["dev_update_time"] = "10:20"
+        await coordinator.async_refresh()
+        assert not _online(coordinator, "A")
+
+        # 没有新的上报，继续保留
+        await coordinator.async_refresh()
+        assert not _online(coordinator, "A")
+
+        # 设备再次上报，以轮询结果为准
+        api.devices[0]["dev_update_time"] = "10:45"
+        await coordinator.async_refresh()
+        assert _online(coordinator, "A")
+    finally:
+        await hass.async_stop(force=True)
+
+
+async def test_new_push_resets_reference(tmp_path):
+    hass, api, coordinator = await _coordinator(
+        tmp_path, [{"uid": "A", "dev_update_time": "10:00"}]
+    )
+    try:
+        coordinator.async_apply_patch("A", {ATTR_ONLINE: False})
+        await coordinator.async_refresh()
+        api.devices[0]["dev_update_time"] = "10:30"
+        await coordinator.async_refresh()
+        assert _online(coordinator, "A")
+
+        coordinator.async_apply_patch("A", {ATTR_ONLINE: False})
+        await coordinator.async_refresh()
+        assert not _online(coordinator, "A")
+    finally:
+        await hass.async_stop(force=True)
@@ -0,0 +1,44 @@
+"""自适应心跳的测试"""
+from custom_components.dingding_smart.heartbeat import HeartbeatController
+
+from .common import FakeClock
+
+
+def _answer_probes(controller, clock, count, rtt=0.05):
+    for _ in range(count):
+        controller.on_probe_sent()
+        clock.advance(rtt)
+        controller.on_received(True)
+        clock.advance(controller.interval)
+
+
+def test_interval_grows_to_max_then_backs_off_below_failure():
+    clock = FakeClock()
+    controller = HeartbeatController(60, 30, 120, 10, clock=clock)
+
+    _answer_probes(controller, clock, 30)
+    assert controller.interval == 120
+    assert controller.ceiling is None
+    assert controller.echo_confirmed
+
+    # 等待探测时连接断开：减小间隔并记下上限
+    controller.on_probe_sent()
+    controller.on_connection_lost()
+    assert (controller.interval, controller.ceiling) == (100, 120)
+    assert controller.nat_drops == 1
+
+    _answer_probes(controller, clock, 30)
+    assert controller.interval == 110
+
+
+def test_unanswered_probe_times_out():
+    clock = FakeClock()
+    controller = HeartbeatController(clock=clock)
+    _answer_probes(controller, clock, 2, rtt=0.1)
+
+    controller.on_probe_sent()
+    clock.advance(controller.ack_timeout - 0.01)
+    assert not controller.timed_out()
+    clock.advance(0.02)
+    assert controller.timed_out()
+    assert controller.timeouts == 1
@@ -0,0 +1,122 @@
+"""推送中心写入合并和定时心跳的测试"""
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.dingding_smart import REGION_CN, async_get_push_hub
+from custom_components.dingding_smart.hub import (
+    PUSH_MODE_ASYNCIO,
+    PUSH_MODE_THREAD,
+    PushHub,
+)
+from custom_components.dingding_smart.protocol import (
+    CMD_HEARTBEAT,
+    CMD_PUSH,
+    HEARTBEAT_FRAME,
+    WriteScheduler,
+    pack_frame,
+)
+
+from .common import PUSH_TOKEN, PushRecorder, PushServer, wait_for
+
+BURST = 50
+
+
+def test_write_scheduler_joins_frames_in_order():
+    writer = WriteScheduler()
+    assert writer.take() is None
+
+    push = pack_frame(CMD_PUSH, b"{}")
+    assert writer.queue(HEARTBEAT_FRAME) is True
+    assert writer.queue(push) is False
+    assert writer.queue(HEARTBEAT_FRAME) is False
+    assert len(writer) == 3
+
+    assert writer.take() == HEARTBEAT_FRAME + push + HEARTBEAT_FRAME
+    assert len(writer) == 0
+    assert (writer.frames, writer.writes) == (3, 1)
+
+    writer.queue(HEARTBEAT_FRAME)
+    writer.clear()
+    assert writer.take() is None
+    assert (writer.frames, writer.writes) == (3, 1)
+
+
+async def _start_hub(tmp_path, server_ssl_context, push_mode):
+    hass = HomeAssistant(str(tmp_path))
+    server = PushServer(server_ssl_context)
+    await server.start()
+    hub = PushHub(hass, "127.0.0.1", server.port, push_mode=push_mode)
+    recorder = PushRecorder()
+    await hub.async_subscribe(recorder)
+    await wait_for(lambda: recorder.tokens)
+    # 推送token帧的心跳确认
+    await wait_for(lambda: server.count(CMD_HEARTBEAT) == 1)
+    return hass, server, hub, recorder
+
+
+async def _stop_hub(hass, server, hub):
+    await hub.async_stop()
+    await server.stop()
+    await hass.async_stop(force=True)
+
+
+@pytest.mark.parametrize("push_mode", [PUSH_MODE_ASYNCIO, PUSH_MODE_THREAD])
+async def test_burst_acks_are_coalesced(tmp_path, server_ssl_context, push_mode):
+    """一次到达的多条推送，每条一个心跳确认，合并为很少几次写入"""
+    hass, server, hub, recorder = await _start_hub(tmp_path, server_ssl_context, push_mode)
+    try:
+        assert recorder.tokens == [PUSH_TOKEN]
+        writes = hub.stats["writes"]
+        frames_sent = hub.stats["frames_sent"]
+
+        server.push(
+            [{"type": "0", "uid": "U1", "message": f"pir{i}"} for i in range(BURST)]
+        )
+        await wait_for(lambda: server.count(CMD_HEARTBEAT) == 1 + BURST)
+        await wait_for(lambda: len(recorder.events) == BURST)
+
+        assert [event.message for event in recorder.events] == [
+            f"pir{i}" for i in range(BURST)
+        ]
+        assert hub.stats["frames_sent"] - frames_sent == BURST
+        assert hub.stats["writes"] - writes <= 3
+    finally:
+        await _stop_hub(hass, server, hub)
+
+
+async def test_idle_heartbeat_sent_by_timer(tmp_path, server_ssl_context):
+    """没有收到数据时，定时器按心跳间隔发送心跳包"""
+    hass = HomeAssistant(str(tmp_path))
+    server = PushServer(server_ssl_context)
+    await server.start()
+    hub = PushHub(hass, "127.0.0.1", server.port)
+    hub.heartbeat.interval = 0.2
+    recorder = PushRecorder()
+    try:
+        await hub.async_subscribe(recorder)
+        await wait_for(lambda: recorder.tokens)
+        await wait_for(lambda: server.count(CMD_HEARTBEAT) >= 3)
+        assert hub.heartbeat.probes >= 2
+    finally:
+        await _stop_hub(hass, server, hub)
+
+
+async def test_shared_hub_warns_about_ignored_settings(tmp_path, caplog):
+    """同一区域的后续配置项设置不同时使用第一个配置项的设置并警告"""
+    hass = HomeAssistant(str(tmp_path))
+    try:
+        hub = await async_get_push_hub(hass, REGION_CN, "imei-1", PUSH_MODE_ASYNCIO, 30)
+
+        caplog.clear()
+        assert await async_get_push_hub(hass, REGION_CN, None, PUSH_MODE_ASYNCIO, 30) is hub
+        assert not caplog.records
+
+        assert await async_get_push_hub(hass, REGION_CN, "imei-2", PUSH_MODE_THREAD, 5) is hub
+        messages = [record.getMessage() for record in caplog.records]
+        assert len(messages) == 3
+        assert "忽略配置的thread模式" in messages[0]
+        assert "IMEI imei-1" in messages[1] and "忽略配置的IMEI imei-2" in messages[1]
+        assert "忽略配置的5秒" in messages[2]
+        assert (hub.push_mode, hub.imei, hub.dedup.ttl) == (PUSH_MODE_ASYNCIO, "imei-1", 30)
+    finally:
+        await hass.async_stop(force=True)
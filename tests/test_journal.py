@@ -0,0 +1,165 @@
+"""推送事件日志的测试"""
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+import custom_components.dingding_smart as dingding
+from custom_components.dingding_smart.journal import (
+    DATA_START,
+    FILE_HEADER,
+    MAGIC,
+    VERSION,
+    EventJournal,
+)
+
+CAPACITY = 512
+
+
+def _open(path, capacity: int = CAPACITY) -> EventJournal:
+    journal = EventJournal(str(path), capacity)
+    journal.open()
+    return journal
+
+
+def _seqs(journal: EventJournal) -> list:
+    return [seq for seq, _, _ in journal.records()]
+
+
+def _append(journal: EventJournal, first: int, last: int):
+    for i in range(first, last + 1):
+        assert journal.append("event", {"i": i}, timestamp=float(i))
+
+
+def _unlock(uid: str, method: str) -> dict:
+    return {"uid": uid, "method": method}
+
+
+async def test_services_scan_journal_in_executor(tmp_path, monkeypatch):
+    """查询和回放服务在执行器中解码日志，事件循环只复制日志内容"""
+    hass = HomeAssistant(str(tmp_path))
+    journal = EventJournal(str(tmp_path / "entry.journal"))
+    await hass.async_add_executor_job(journal.open)
+    for i, method in enumerate(["fingerprint", "password", "card"]):
+        journal.append(dingding.EVENT_DOOR_UNLOCK, _unlock("U1", method), timestamp=1000.0 + i)
+    journal.append(dingding.EVENT_DOOR_UNLOCK, _unlock("U2", "app"), timestamp=1003.0)
+    hass.data.setdefault(dingding.DOMAIN, {})["entry"] = {"push": SimpleNamespace(journal=journal)}
+
+    threads = []
+    query_records = dingding.query_records
+
+    def recording_query_records(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return query_records(*args, **kwargs)
+
+    monkeypatch.setattr(dingding, "query_records", recording_query_records)
+    fired = []
+    hass.bus.async_listen(dingding.EVENT_DOOR_UNLOCK, fired.append)
+    dingding._async_register_services(hass)
+    try:
+        response = await hass.services.async_call(
+            dingding.DOMAIN,
+            dingding.SERVICE_QUERY_EVENTS,
+            {"uid": "U1", "limit": 2},
+            blocking=True,
+            return_response=True,
+        )
+        assert [event["data"]["method"] for event in response["events"]] == ["password", "card"]
+
+        await hass.services.async_call(
+            dingding.DOMAIN, dingding.SERVICE_REPLAY_EVENTS, {"uid": "U2"}, blocking=True
+        )
+        await hass.async_block_till_done()
+        assert [event.data for event in fired] == [{"uid": "U2", "method": "app", "replayed": True}]
+
+        assert len(threads) == 2
+        assert threading.main_thread() not in threads
+    finally:
+        await hass.async_add_executor_job(journal.close)
+        await hass.async_stop(force=True)
+
+
+def test_wraps_and_evicts_oldest(tmp_path):
+    path = tmp_path / "wrap.journal"
+    journal = _open(path)
+    _append(journal, 1, 40)
+
+    kept = len(journal)
+    assert 0 < kept < 40
+    assert journal.overwritten == 40 - kept
+    assert _seqs(journal) == list(range(41 - kept, 41))
+    assert [record["data"]["i"] for _, _, record in journal.records()] == _seqs(journal)
+    journal.close()
+
+    # 重新打开后记录和序号保持连续
+    journal = _open(path)
+    assert _seqs(journal) == list(range(41 - kept, 41))
+    _append(journal, 41, 41)
+    assert _seqs(journal)[-1] == 41
+    assert journal.last("event")["data"] == {"i": 41}
+    journal.close()
+
+
+def test_oversized_record_is_dropped(tmp_path):
+    journal = _open(tmp_path / "big.journal")
+    _append(journal, 1, 2)
+    assert not journal.append("event", {"blob": "x" * CAPACITY})
+    assert journal.dropped == 1
+    assert _seqs(journal) == [1, 2]
+    journal.close()
+
+
+@pytest.mark.parametrize("appended", [3, 40], ids=["no_wrap", "after_wrap"])
+def test_torn_last_record_is_discarded(tmp_path, appended):
+    """最后一条记录不完整（CRC不符）时重新打开丢弃该记录，之后继续追加"""
+    path = tmp_path / "torn.journal"
+    journal = _open(path)
+    _append(journal, 1, appended)
+    seqs = _seqs(journal)
+    last_byte = journal._head - 1
+    journal.close()
+
+    with open(path, "r+b") as file:
+        file.seek(last_byte)
+        byte = file.read(1)
+        file.seek(last_byte)
+        file.write(bytes([byte[0] ^ 0xFF]))
+
+    journal = _open(path)
+    assert len(journal) == len(seqs) - 1
+    assert _seqs(journal) == seqs[:-1]
+    _append(journal, appended + 1, appended + 1)
+    assert _seqs(journal)[-1] == appended + 1
+    journal.close()
+
+    journal = _open(path)
+    assert _seqs(journal) == seqs[:-1] + [appended + 1]
+    journal.close()
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"x" * 10,
+        b"x" * 31,
+        os.urandom(DATA_START),
+        FILE_HEADER.pack(MAGIC, VERSION, CAPACITY, CAPACITY + 100, DATA_START, 1, 2).ljust(CAPACITY, b"\0"),
+    ],
+    ids=["empty", "10_bytes", "31_bytes", "garbage_header", "head_out_of_range"],
+)
+def test_corrupt_file_is_recreated(tmp_path, content):
+    path = tmp_path / "corrupt.journal"
+    path.write_bytes(content)
+
+    journal = _open(path)
+    assert len(journal) == 0
+    assert journal.capacity == CAPACITY
+    _append(journal, 1, 1)
+    journal.close()
+
+    journal = _open(path)
+    assert journal.last("event")["data"] == {"i": 1}
+    journal.close()
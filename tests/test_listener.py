@@ -0,0 +1,36 @@
+"""推送监听器的测试"""
+import asyncio
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.dingding_smart import PushListener
+
+
+class _OfflineApi:
+    """云端API不可达的替身"""
+
+    token = None
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def ensure_token(self) -> bool:
+        self.attempts += 1
+        return False
+
+
+async def test_bind_retry_does_not_block_hass(tmp_path):
+    """API不可达时绑定在后台一直重试，不阻塞Home Assistant等待任务完成"""
+    hass = HomeAssistant(str(tmp_path))
+    api = _OfflineApi()
+    listener = PushListener(hass, api, None, entry_id="entry")
+    try:
+        listener.on_push_token("push-token")
+        await asyncio.wait_for(hass.async_block_till_done(), 2)
+        await asyncio.sleep(0)
+        assert api.attempts >= 1
+        assert listener.stats["bind_failures"] >= 1
+        assert not listener._bind_task.done()
+    finally:
+        listener._bind_task.cancel()
+        await hass.async_stop(force=True)
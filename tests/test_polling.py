@@ -0,0 +1,44 @@
+"""设备列表轮询策略的测试"""
+from custom_components.dingding_smart.polling import MIN_POLL_INTERVAL, PollPolicy
+
+from .common import FakeClock
+
+
+def test_unchanged_polls_back_off_until_max():
+    policy = PollPolicy(300, max_interval=1800, clock=FakeClock())
+    intervals = []
+    for _ in range(4):
+        policy.record_poll(changed=False)
+        intervals.append(policy.next_interval())
+    assert intervals == [600, 1200, 1800, 1800]
+    assert policy.polls_unchanged == 4
+
+    policy.record_poll(changed=True)
+    assert policy.next_interval() == 300
+
+
+def test_boost_shortens_interval_for_a_while():
+    clock = FakeClock()
+    policy = PollPolicy(300, boost_interval=30, boost_duration=180, clock=clock)
+    policy.record_poll(changed=False)
+
+    policy.boost()
+    assert policy.boosting
+    assert policy.next_interval() == 30
+
+    clock.advance(179)
+    assert policy.next_interval() == 30
+    clock.advance(1)
+    assert not policy.boosting
+    assert policy.next_interval() == 600
+
+
+def test_base_interval_limits():
+    policy = PollPolicy(5, clock=FakeClock())
+    assert policy.base_interval == MIN_POLL_INTERVAL
+    assert policy.enabled
+
+    policy.record_poll(changed=False)
+    policy.set_base(0)
+    assert not policy.enabled
+    assert policy.interval == 0
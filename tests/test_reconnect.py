@@ -0,0 +1,89 @@
+"""推送重连策略的测试"""
+from custom_components.dingding_smart.reconnect import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    ReconnectPolicy,
+)
+
+from .common import FakeClock
+
+
+def _policy(clock, rng=lambda: 1.0, **kwargs) -> ReconnectPolicy:
+    kwargs.setdefault("base_delay", 2.0)
+    kwargs.setdefault("max_delay", 120.0)
+    kwargs.setdefault("failure_threshold", 3)
+    kwargs.setdefault("open_duration", 300.0)
+    kwargs.setdefault("stable_after", 60.0)
+    return ReconnectPolicy(clock=clock, rng=rng, **kwargs)
+
+
+def test_backoff_cap_doubles_up_to_max_delay():
+    policy = _policy(FakeClock(), failure_threshold=100)
+    caps = []
+    for _ in range(8):
+        caps.append(policy.next_delay())
+        policy.record_failure()
+    assert caps == [2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 120.0, 120.0]
+
+
+def test_full_jitter_scales_the_cap():
+    policy = _policy(FakeClock(), rng=lambda: 0.25)
+    policy.record_failure()
+    assert policy.next_delay() == 1.0
+    assert policy.last_delay == 1.0
+
+
+def test_circuit_closed_open_half_open_closed():
+    clock = FakeClock()
+    policy = _policy(clock)
+
+    for _ in range(2):
+        policy.record_failure()
+        assert policy.state == STATE_CLOSED
+    policy.record_failure()
+    assert policy.state == STATE_OPEN
+    assert policy.circuit_opens == 1
+
+    # 熔断期间等待到熔断结束，之后只允许一次试探连接
+    clock.advance(100)
+    assert policy.next_delay() == 200.0
+    assert policy.state == STATE_HALF_OPEN
+
+    clock.advance(200)
+    policy.record_connected()
+    assert policy.state == STATE_CLOSED
+
+    # 连接保持足够久后断开，重置退避
+    clock.advance(60)
+    policy.record_disconnect()
+    assert policy.state == STATE_CLOSED
+    assert policy.failures == 0
+    assert policy.next_delay() == 2.0
+
+
+def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    policy = _policy(clock)
+    for _ in range(3):
+        policy.record_failure()
+
+    clock.advance(300)
+    assert policy.next_delay() == 0.0
+    assert policy.state == STATE_HALF_OPEN
+
+    policy.record_failure()
+    assert policy.state == STATE_OPEN
+    assert policy.circuit_opens == 2
+    assert policy.next_delay() == 300.0
+
+
+def test_short_lived_connection_counts_as_failure():
+    clock = FakeClock()
+    policy = _policy(clock)
+    policy.record_connected()
+    clock.advance(5)
+    policy.record_disconnect()
+    assert policy.failures == 1
+    assert policy.total_connects == 1
+    assert policy.as_dict()["total_failures"] == 1